@@ -2,8 +2,9 @@
 """
 Bot - asosiy fayl
 """
-from aiogram import executor
-from loader import dp, user_db, dars_db, channel_db
+from aiogram import executor, types
+from loader import dp, storage, user_db, dars_db, channel_db, counter_buffer, activity_tracker, blocked_users, subscription_watcher
+from utils.db_api.migrations import apply_migrations
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,8 @@ async def on_startup(dispatcher):
         # Jadvalarni yaratish
         user_db.create_table()
         dars_db.create_tables()
+        apply_migrations(dars_db)
+        user_db.load_admins()
         logger.info("✅ Jadvallar tayyor")
     except Exception as e:
         logger.error(f"❌ Database xatosi: {e}")
@@ -68,6 +71,24 @@ async def on_startup(dispatcher):
     except ImportError as e:
         logger.error(f"⚠️ Handler import xatosi: {e}")
         logger.error("handlers/admin/__init__.py faylini tekshiring!")
+
+    # Hisoblagichlarni davriy yozish
+    counter_buffer.start()
+    activity_tracker.start()
+    blocked_users.start()
+
+    # Obunani kutayotganlar uchun rejalashtiruvchi
+    subscription_watcher.start()
+
+    # FSM holatlarini yuklash va davriy saqlash
+    storage.start()
+
+    # Uzilib qolgan reklamalarni davom ettirish
+    try:
+        from handlers.users.reklama import resume_advertisements
+        await resume_advertisements()
+    except Exception as e:
+        logger.error(f"❌ Reklamalarni tiklash xatosi: {e}")
     
     logger.info("🎉 Bot tayyor!")
 
@@ -75,7 +96,24 @@ async def on_startup(dispatcher):
 async def on_shutdown(dispatcher):
     """Bot to'xtaganda"""
     logger.info("⏹ Bot to'xtatilmoqda...")
-    channel_db.close()
+    # Har biri alohida - bittasining xatosi qolganlarining yozuvlarini yo'qotmasin
+    steps = [
+        ("Yuklab olishlar", counter_buffer.stop),
+        ("Faollik", activity_tracker.stop),
+        ("Bloklanganlar", blocked_users.stop),
+        ("Obuna kuzatuvchisi", subscription_watcher.stop),
+        ("FSM holatlari", storage.close),
+    ]
+    for name, stop in steps:
+        try:
+            await stop()
+        except Exception:
+            logger.exception(f"❌ {name}: to'xtatishda xatolik")
+
+    try:
+        channel_db.close()
+    except Exception:
+        logger.exception("❌ Database yopishda xatolik")
     logger.info("👋 Bot to'xtatildi")
 
 
@@ -84,5 +122,13 @@ if __name__ == '__main__':
         dp,
         on_startup=on_startup,
         on_shutdown=on_shutdown,
-        skip_updates=True
+        skip_updates=True,
+        # chat_member faqat aniq so'ralganda keladi (kanal a'zoligi uchun),
+        # my_chat_member - foydalanuvchi botni bloklashi/qayta ochishi
+        allowed_updates=[
+            types.AllowedUpdates.MESSAGE,
+            types.AllowedUpdates.CALLBACK_QUERY,
+            types.AllowedUpdates.CHAT_MEMBER,
+            types.AllowedUpdates.MY_CHAT_MEMBER,
+        ]
     )
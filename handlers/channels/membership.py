@@ -0,0 +1,33 @@
+"""
+Kanal a'zoligi - chat_member yangilanishlaridan mahalliy jadvalni yuritish
+"""
+from aiogram import types
+
+from loader import dp, channel_db, subscription_service, subscription_watcher
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def is_mandatory_channel(update: types.ChatMemberUpdated) -> bool:
+    """Majburiy kanallardan biri (xotiradagi ro'yxatdan)"""
+    return channel_db.channel_exists(update.chat.id)
+
+
+@dp.chat_member_handler(is_mandatory_channel)
+async def track_membership(update: types.ChatMemberUpdated):
+    """Obuna bo'lish/chiqishni qayd qilish (bot kanalda admin bo'lishi kerak)"""
+    member = update.new_chat_member
+
+    try:
+        # Jadval va obuna keshi birga yangilanadi
+        is_member = await subscription_service.on_member_update(update.chat.id, member.user.id, member.status)
+    except Exception as e:
+        logger.error(f"A'zolikni yozish xatosi: {e}")
+        return
+
+    # Obunani kutayotgan bo'lsa - keyingi tickda tasdiqlanadi
+    if is_member:
+        subscription_watcher.nudge(member.user.id)
+
+    logger.info(f"{'➕' if is_member else '➖'} Kanal {update.chat.id}: {member.user.id} ({member.status})")
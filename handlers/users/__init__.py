@@ -4,4 +4,9 @@ from . import start
 from . import main_handlers
 from . import reklama
 from . import middleware
-from . import admin_handler
\ No newline at end of file
+from . import admin_handler
+from . import bot_status
+
+# Erkin matnli qidiruv - eng oxirida (boshqa tugmalarni yutib yubormasligi uchun)
+from loader import dp
+main_handlers.register_search_handler(dp)
@@ -6,10 +6,10 @@ from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters import Text
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from data.config import ADMINS
 from keyboards.default.admin_menu import admin_menu
 from keyboards.default.confirm_menu import confirm_menu
 from loader import dp, bot, dars_db, user_db
+from utils.misc.dates import format_date
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,7 +36,7 @@ class AddFakultet(StatesGroup):
 # ==================== ADMIN TEKSHIRISH ====================
 def is_admin(user_id: int) -> bool:
     """Admin tekshirish"""
-    return user_id in ADMINS or user_db.check_if_admin(user_id)
+    return user_db.is_admin(user_id)
 
 
 # ==================== FAQAT ASOSIY MENYU VA BEKOR QILISH ====================
@@ -65,7 +65,7 @@ async def exit_to_main_menu(message: types.Message, state: FSMContext):
 @dp.message_handler(lambda m: m.text == "➕ Dars Qo'shish" and is_admin(m.from_user.id))
 async def start_add_course(message: types.Message):
     """Dars qo'shishni boshlash"""
-    fakultetlar = dars_db.get_all_fakultetlar()
+    fakultetlar = await dars_db.catalog.fakultetlar_async()
 
     if not fakultetlar:
         await message.answer(
@@ -75,16 +75,8 @@ async def start_add_course(message: types.Message):
         return
 
     markup = InlineKeyboardMarkup(row_width=1)
-    for fak in fakultetlar:
-        # sqlite3.Row yoki tuple
-        if isinstance(fak, tuple):
-            fak_id = fak[0]
-            fak_name = fak[1]
-        else:
-            # sqlite3.Row - index orqali
-            fak_id = fak[0]
-            fak_name = fak[1]
-
+    # Admin ro'yxati - alifbo tartibida
+    for fak_id, fak_name in sorted(fakultetlar, key=lambda fak: fak[1]):
         markup.add(InlineKeyboardButton(
             f"📚 {fak_name}",
             callback_data=f"addfak_{fak_id}"
@@ -104,22 +96,7 @@ async def start_add_course(message: types.Message):
 async def select_fakultet(call: types.CallbackQuery, state: FSMContext):
     """Fakultet tanlash"""
     fak_id = int(call.data.split("_")[1])
-    fakultetlar = dars_db.get_all_fakultetlar()
-    fak_name = None
-
-    for fak in fakultetlar:
-        # sqlite3.Row yoki tuple
-        if isinstance(fak, tuple):
-            f_id = fak[0]
-            f_name = fak[1]
-        else:
-            # sqlite3.Row - index
-            f_id = fak[0]
-            f_name = fak[1]
-
-        if f_id == fak_id:
-            fak_name = f_name
-            break
+    fak_name = await dars_db.catalog.fakultet_name_async(fak_id)
 
     if not fak_name:
         await call.answer("❌ Xato")
@@ -166,7 +143,7 @@ async def add_code(message: types.Message, state: FSMContext):
     if len(code) < 3:
         return await message.answer("❌ Kod kamida 3 ta belgi")
 
-    if dars_db.search_dars_by_code(code):
+    if await dars_db.search_dars_by_code_async(code):
         return await message.answer(f"❌ Bu kod mavjud: {code}")
 
     async with state.proxy() as data:
@@ -241,7 +218,7 @@ async def add_file(message: types.Message, state: FSMContext):
             title = data['title']
 
         # Darsni qo'shish
-        dars_db.add_dars(
+        await dars_db.add_dars_async(
             dars_id=fakultet_id,
             code=code,
             title=title,
@@ -290,7 +267,7 @@ async def start_delete_course(message: types.Message):
 async def confirm_delete(message: types.Message, state: FSMContext):
     """O'chirishni tasdiqlash"""
     code = message.text.strip().upper()
-    dars = dars_db.search_dars_by_code(code)
+    dars = await dars_db.search_dars_by_code_async(code)
 
     if not dars:
         return await message.answer(f"❌ Dars topilmadi: {code}")
@@ -330,7 +307,7 @@ async def delete_confirmed(message: types.Message, state: FSMContext):
             code = data['code']
             # title va downloads ham olinadi agar kerak bo'lsa
 
-        dars_db.delete_dars(code)
+        await dars_db.delete_dars_async(code)
 
         await message.answer(
             f"✅ Dars o'chirildi!\n\n🔢 Kod: {code}",
@@ -358,7 +335,7 @@ async def add_fakultet(message: types.Message, state: FSMContext):
     """Fakultet qo'shish"""
     try:
         name = message.text.strip()
-        dars_db.add_fakultet(name)
+        await dars_db.add_fakultet_async(name)
 
         await message.answer(
             f"✅ Fakultet qo'shildi!\n\n🏫 {name}",
@@ -379,15 +356,13 @@ async def add_fakultet(message: types.Message, state: FSMContext):
 async def show_simple_stats(message: types.Message):
     """Oddiy statistika"""
     try:
-        total = user_db.count_users()
-        daily = user_db.count_daily_users()
-        active = user_db.count_active_daily_users()
+        stats = await user_db.get_dashboard_snapshot_async()
 
         await message.answer(
             f"📊 <b>Statistika</b>\n\n"
-            f"👥 Jami: {total} ta\n"
-            f"📅 Bugun: +{daily} ta\n"
-            f"🔥 Faol: {active} ta",
+            f"👥 Jami: {stats['total']} ta\n"
+            f"📅 Bugun: +{stats['daily']} ta | Hafta: +{stats['weekly']} | Oy: +{stats['monthly']}\n"
+            f"🔥 Faol: {stats['active_daily']} ta | Hafta: {stats['active_weekly']} | Oy: {stats['active_monthly']}",
             parse_mode="HTML"
         )
     except Exception as e:
@@ -401,16 +376,7 @@ async def list_all_courses(message: types.Message):
     """Barcha darslarni ko'rish"""
     try:
         # Eng oxirgi 20 ta darsni olish
-        conn = dars_db.connection
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT code, title, created_at, length(file_id) as file_len
-            FROM Lesson 
-            ORDER BY created_at DESC 
-            LIMIT 20
-        """)
-        darslar = cursor.fetchall()
-        conn.close()
+        darslar = await dars_db.get_latest_darslar_async(20)
 
         if not darslar:
             return await message.answer("❌ Darslar yo'q")
@@ -419,7 +385,7 @@ async def list_all_courses(message: types.Message):
         for idx, dars in enumerate(darslar, 1):
             code = dars[0]
             title = dars[1][:30]
-            date = dars[2][:10]
+            date = format_date(dars[2])
             file_len = dars[3]
 
             status = "✅" if file_len > 50 else "❌"
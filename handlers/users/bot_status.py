@@ -0,0 +1,25 @@
+"""
+Bot holati - foydalanuvchi botni bloklasa yoki qayta ochsa
+"""
+from aiogram import types
+
+from loader import dp, blocked_users
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dp.my_chat_member_handler(chat_type=types.ChatType.PRIVATE)
+async def track_bot_status(update: types.ChatMemberUpdated):
+    """kicked - bloklandi, member - qayta ochildi (is_blocked partiyalab yoziladi)"""
+    status = update.new_chat_member.status
+    user_id = update.from_user.id
+
+    if status == types.ChatMemberStatus.KICKED:
+        blocked_users.mark_blocked(user_id)
+    elif status == types.ChatMemberStatus.MEMBER:
+        blocked_users.mark_unblocked(user_id)
+    else:
+        return
+
+    logger.info(f"{'🚫' if status == types.ChatMemberStatus.KICKED else '✅'} Bot holati {user_id}: {status}")
@@ -6,7 +6,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils import executor
 from data.config import ADMINS, BOT_TOKEN
 from keyboards.default.admin_menu import admin_menu
-from loader import dp, channel_db, bot
+from loader import dp, channel_db, bot, subscription_service
 
 # Inline klaviaturalar
 def get_channel_menu():
@@ -37,31 +37,12 @@ def get_delete_keyboard(channels):
 class ChannelAdd(StatesGroup):
     channel_link = State()
 
-# Obuna holatini tekshirish funksiyasi
-async def check_subscription(user_id: int, channel_id: int) -> bool:
-    try:
-        member = await bot.get_chat_member(chat_id=channel_id, user_id=user_id)
-        return member.status in ["member", "administrator", "creator"]
-    except Exception as e:
-        print(f"❌ Xatolik: {channel_id} kanalida foydalanuvchi {user_id} ni tekshirishda: {e}")
-        return False
-
+# Obuna holatini tekshirish - umumiy xizmat orqali (kesh va API chegarasi bilan)
 async def is_subscribed_to_all_channels(user_id: int) -> bool:
-    channels = channel_db.get_all_channels()
-    if not channels:
-        return True
-    for channel_id, _, _ in channels:
-        if not await check_subscription(user_id, channel_id):
-            return False
-    return True
+    return await subscription_service.is_subscribed(user_id)
 
 async def get_unsubscribed_channels(user_id: int) -> list:
-    channels = channel_db.get_all_channels()
-    unsubscribed = []
-    for channel_id, title, static_link in channels:
-        if not await check_subscription(user_id, channel_id):
-            unsubscribed.append((static_link, title))  # Statik havola ishlatiladi
-    return unsubscribed
+    return await subscription_service.get_unsubscribed(user_id)  # Statik havola ishlatiladi
 
 # Kanal bo‘limi
 @dp.message_handler(text="📢 Kanallar")
@@ -102,15 +83,15 @@ async def process_channel_link(message: types.Message, state: FSMContext):
         channel_title = channel.title
 
         # Kanal havolasini faqat bir marta yaratish va statik qilib saqlash
-        if channel_db.channel_exists(channel_id):
-            static_link = channel_db.get_channel_link(channel_id)
+        if await channel_db.channel_exists_async(channel_id):
+            static_link = await channel_db.get_channel_link_async(channel_id)
         else:
             try:
                 static_link = await bot.export_chat_invite_link(channel_id)
             except Exception:
                 static_link = f"Shaxsiy kanal ID: {channel_id}"
 
-        if channel_db.channel_exists(channel_id):
+        if await channel_db.channel_exists_async(channel_id):
             await message.answer("⚠️ Bu kanal allaqachon mavjud.")
             await state.finish()
             return
@@ -133,7 +114,7 @@ async def process_channel_link(message: types.Message, state: FSMContext):
 async def confirm_channel_add(callback: types.CallbackQuery, state: FSMContext):
     channel_id = int(callback.data.split("_")[2])
     async with state.proxy() as data:
-        channel_db.add_channel(data['channel_id'], data['channel_title'], data['static_link'])
+        await channel_db.add_channel_async(data['channel_id'], data['channel_title'], data['static_link'])
     await callback.message.edit_text("✅ Kanal qo‘shildi!", reply_markup=get_channel_menu())
     await state.finish()
 
@@ -147,7 +128,7 @@ async def cancel_channel_add(callback: types.CallbackQuery, state: FSMContext):
 @dp.callback_query_handler(lambda c: c.data == "list_channels")
 async def list_channels(callback: types.CallbackQuery):
     if callback.from_user.id in ADMINS:
-        channels = channel_db.get_all_channels()
+        channels = await channel_db.get_all_channels_async()
         if channels:
             response = "📜 <b>Kanallar ro‘yxati:</b>\n\n"
             for i, (channel_id, title, static_link) in enumerate(channels, 1):
@@ -163,7 +144,7 @@ async def list_channels(callback: types.CallbackQuery):
 @dp.callback_query_handler(lambda c: c.data == "delete_channel")
 async def start_delete_channel(callback: types.CallbackQuery):
     if callback.from_user.id in ADMINS:
-        channels = channel_db.get_all_channels()
+        channels = await channel_db.get_all_channels_async()
         if channels:
             await callback.message.edit_text("🗑 O‘chirmoqchi bo‘lgan kanalni tanlang:",
                                              reply_markup=get_delete_keyboard(channels))
@@ -176,7 +157,7 @@ async def start_delete_channel(callback: types.CallbackQuery):
 @dp.callback_query_handler(lambda c: c.data.startswith("delete_"))
 async def confirm_delete_channel(callback: types.CallbackQuery):
     channel_id = int(callback.data.split("_")[1])
-    channel_db.delete_channel(channel_id)
+    await channel_db.delete_channel_async(channel_id)
     await callback.message.edit_text(f"✅ Kanal (<code>{channel_id}</code>) o‘chirildi.", parse_mode="HTML",
                                      reply_markup=get_channel_menu())
     await callback.answer()
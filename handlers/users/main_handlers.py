@@ -2,21 +2,49 @@
 Main Handlers - Fakultet va dars tanlash (Sahifalash bilan)
 """
 from aiogram import types
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-from data.config import ADMINS, STICKERS
-from keyboards.inline.fakultet import faculty_menu, FACULTY_MAPPING
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils.markdown import quote_html
+from data.config import STICKERS
+from keyboards.inline.fakultet import FACULTY_MAPPING, get_faculty_menu
 from keyboards.default.admin_menu import admin_menu
-from loader import dp, bot, dars_db, user_db
+from loader import dp, bot, dars_db, user_db, counter_buffer
+from utils.misc.cache import TTLCache, VersionedCache
+from utils.misc.dates import format_date
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Sahifalash uchun ma'lumotlarni saqlash
-user_pagination = {}  # {user_id: {'darslar': [], 'page': 0, 'mavzu': '', 'faculty': ''}}
-
 DARS_PER_PAGE = 10  # Har sahifada 10 ta dars
 
 
+class UserSession:
+    """Foydalanuvchi qayerda turgani - darslarning o'zi katalogda"""
+    __slots__ = ('fakultet_id', 'mavzu', 'page')
+
+    def __init__(self, fakultet_id, mavzu, page=0):
+        self.fakultet_id = fakultet_id
+        self.mavzu = mavzu
+        self.page = page
+
+
+# Sahifalash sessiyalari - hajmi cheklangan, 1 soat ishlatilmasa o'chadi
+SESSION_TTL = 3600
+user_sessions = TTLCache(maxsize=20000, ttl=SESSION_TTL)
+
+
+def get_session(user_id):
+    """Sessiyani olish va muddatini uzaytirish"""
+    session = user_sessions.get(user_id)
+    if session is not None:
+        user_sessions.set(user_id, session)
+    return session
+
+# Tayyor klaviaturalar - (tur, fakultet_id, mavzu, sahifa) bo'yicha, katalog
+# tuzilmasi o'zgarsa (versiya) o'z-o'zidan yangilanadi. Yuklanish sonlari
+# keshlanmaydi - dars sahifasi matni har safar katalogdan quriladi.
+_views = VersionedCache(dars_db.catalog, maxsize=2000)
+
+
 # ==================== FAKULTET TANLASH ====================
 @dp.callback_query_handler(lambda c: c.data.startswith("faculty_"))
 async def select_faculty(call: types.CallbackQuery):
@@ -26,33 +54,31 @@ async def select_faculty(call: types.CallbackQuery):
     if call.data == "faculty_back":
         await call.message.edit_text(
             "🎓 Fakultetingizni tanlang:",
-            reply_markup=faculty_menu
+            reply_markup=await get_faculty_menu()
         )
         return
 
-    faculty_name = FACULTY_MAPPING.get(call.data)
-    if not faculty_name:
-        await call.message.answer("❌ Xato")
-        return
-
-    # Fakultetni saqlash
-    user_db.update_faculty(call.from_user.id, faculty_name)
-
-    # Fakultet ID topish
-    fakultetlar = dars_db.get_all_fakultetlar()
-    fakultet_id = None
-
-    for fak in fakultetlar:
-        if fak['name'] == faculty_name:
-            fakultet_id = fak['id']
-            break
+    # faculty_<id> yoki eski xabarlardagi nomli callback
+    suffix = call.data.split("_", 1)[1]
+    if suffix.isdigit():
+        fakultet_id = int(suffix)
+        faculty_name = await dars_db.catalog.fakultet_name_async(fakultet_id)
+    else:
+        faculty_name = FACULTY_MAPPING.get(call.data)
+        if not faculty_name:
+            await call.message.answer("❌ Xato")
+            return
+        fakultet_id = await dars_db.catalog.fakultet_id_async(faculty_name)
 
-    if not fakultet_id:
+    if not fakultet_id or not faculty_name:
         await call.message.answer(
             "❌ Fakultet topilmadi\n📝 Admin qo'shishi kerak"
         )
         return
 
+    # Fakultetni saqlash
+    await user_db.update_faculty_async(call.from_user.id, faculty_name)
+
     # Mavzularni ko'rsatish
     await show_mavzular(call.message, fakultet_id, faculty_name, edit=True)
 
@@ -60,9 +86,16 @@ async def select_faculty(call: types.CallbackQuery):
 # ==================== MAVZULARNI KO'RSATISH ====================
 async def show_mavzular(message, fakultet_id, faculty_name, edit=False):
     """Mavzular ro'yxati"""
-    darslar = dars_db.get_dars_by_fakultet(fakultet_id)
-
-    if not darslar:
+    key = ('mavzular', fakultet_id)
+    view = _views.get(key)
+    if view is None:
+        version = _views.version
+        mavzular = await dars_db.catalog.mavzular_async(fakultet_id)
+        view = build_mavzular_view(faculty_name, mavzular) if mavzular else None
+        if view:
+            _views.set(key, view, version)
+
+    if view is None:
         text = f"📚 <b>{faculty_name}</b>\n\n❌ Hozircha darslar yo'q"
         markup = ReplyKeyboardMarkup(resize_keyboard=True)
         markup.add(KeyboardButton("🔙 Fakultetlar"))
@@ -74,20 +107,20 @@ async def show_mavzular(message, fakultet_id, faculty_name, edit=False):
             await message.answer(text, reply_markup=markup, parse_mode="HTML")
         return
 
-    # Mavzularga guruhlash
-    mavzular = {}
-    for dars in darslar:
-        mavzu = dars['mavzu_name'] or "Boshqa"
+    text, markup = view
+    if edit:
+        await message.edit_text("✅ Fakultet tanlandi!")
+        await message.answer(text, reply_markup=markup, parse_mode="HTML")
+    else:
+        await message.answer(text, reply_markup=markup, parse_mode="HTML")
 
-        if mavzu not in mavzular:
-            mavzular[mavzu] = []
-        mavzular[mavzu].append(dars)
 
-    # Klaviatura
+def build_mavzular_view(faculty_name, mavzular):
+    """Mavzular matni va klaviaturasi"""
+    # Klaviatura (mavzular keshda guruhlangan va saralangan)
     markup = ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
 
-    for mavzu in sorted(mavzular.keys()):
-        count = len(mavzular[mavzu])
+    for mavzu, count in mavzular:
         markup.add(KeyboardButton(f"📖 {mavzu} ({count})"))
 
     markup.add(
@@ -98,14 +131,9 @@ async def show_mavzular(message, fakultet_id, faculty_name, edit=False):
     text = (
         f"📚 <b>{faculty_name}</b>\n\n"
         f"📖 Mavzuni tanlang:\n\n"
-        f"📊 Jami: {len(darslar)} ta dars"
+        f"📊 Jami: {sum(count for _, count in mavzular)} ta dars"
     )
-
-    if edit:
-        await message.edit_text("✅ Fakultet tanlandi!")
-        await message.answer(text, reply_markup=markup, parse_mode="HTML")
-    else:
-        await message.answer(text, reply_markup=markup, parse_mode="HTML")
+    return text, markup
 
 
 # ==================== MAVZU TANLASH ====================
@@ -117,41 +145,27 @@ async def select_mavzu(message: types.Message):
     mavzu_name = mavzu_text.split(" (")[0] if " (" in mavzu_text else mavzu_text
 
     # Fakultetni olish
-    faculty = user_db.get_user_faculty(message.from_user.id)
+    faculty = await user_db.get_user_faculty_async(message.from_user.id)
     if not faculty:
-        await message.answer("❌ Avval fakultetni tanlang", reply_markup=faculty_menu)
+        await message.answer("❌ Avval fakultetni tanlang", reply_markup=await get_faculty_menu())
         return
 
     # Fakultet ID
-    fakultetlar = dars_db.get_all_fakultetlar()
-    fakultet_id = None
-    for fak in fakultetlar:
-        if fak['name'] == faculty:
-            fakultet_id = fak['id']
-            break
+    fakultet_id = await dars_db.catalog.fakultet_id_async(faculty)
 
     if not fakultet_id:
         await message.answer("❌ Xato")
         return
 
-    # Mavzu bo'yicha darslar
-    if mavzu_name == "Boshqa":
-        all_darslar = dars_db.get_dars_by_fakultet(fakultet_id)
-        darslar = [d for d in all_darslar if not d['mavzu_name']]
-    else:
-        darslar = dars_db.get_dars_by_mavzu(fakultet_id, mavzu_name)
+    # Mavzu bo'yicha darslar ("Boshqa" - mavzusizlar)
+    darslar = await dars_db.catalog.darslar_async(fakultet_id, mavzu_name)
 
     if not darslar:
         await message.answer("❌ Darslar topilmadi")
         return
 
     # Sahifalash ma'lumotlarini saqlash
-    user_pagination[message.from_user.id] = {
-        'darslar': darslar,
-        'page': 0,
-        'mavzu': mavzu_name,
-        'faculty': faculty
-    }
+    user_sessions.set(message.from_user.id, UserSession(fakultet_id, mavzu_name))
 
     await show_darslar_page(message, message.from_user.id)
 
@@ -159,31 +173,35 @@ async def select_mavzu(message: types.Message):
 # ==================== DARSLARNI SAHIFALAB KO'RSATISH ====================
 async def show_darslar_page(message, user_id):
     """Darslarni sahifalab ko'rsatish"""
-    if user_id not in user_pagination:
+    session = get_session(user_id)
+    if session is None:
         await message.answer("❌ Xato. Qaytadan mavzu tanlang.")
         return
 
-    data = user_pagination[user_id]
-    darslar = data['darslar']
-    page = data['page']
-    mavzu_name = data['mavzu']
-    faculty_name = data['faculty']
+    key = ('page', session.fakultet_id, session.mavzu, session.page)
+
+    version = _views.version
+    faculty_name = await dars_db.catalog.fakultet_name_async(session.fakultet_id)
+    darslar = await dars_db.catalog.darslar_async(session.fakultet_id, session.mavzu)
 
-    # Darslarni aqlli saralash (raqamli tartib)
-    def natural_sort_key(dars):
-        """Raqamlarni to'g'ri saralash uchun"""
-        import re
-        title = dars['title']
-        # Raqamlarni topish va int ga aylantirish
-        parts = re.split(r'(\d+)', title)
-        return [int(part) if part.isdigit() else part.lower() for part in parts]
+    markup = _views.get(key)
+    if markup is None:
+        markup = build_darslar_markup(darslar, session.page)
+        _views.set(key, markup, version)
+
+    text = build_darslar_text(faculty_name, session.mavzu, darslar, session.page)
+    await message.answer(text, reply_markup=markup, parse_mode="HTML")
 
-    darslar_sorted = sorted(darslar, key=natural_sort_key)
 
-    total_pages = (len(darslar_sorted) + DARS_PER_PAGE - 1) // DARS_PER_PAGE
+def _page_bounds(darslar, page):
+    total_pages = (len(darslar) + DARS_PER_PAGE - 1) // DARS_PER_PAGE
     start_idx = page * DARS_PER_PAGE
-    end_idx = start_idx + DARS_PER_PAGE
-    current_darslar = darslar_sorted[start_idx:end_idx]
+    return total_pages, start_idx, darslar[start_idx:start_idx + DARS_PER_PAGE]
+
+
+def build_darslar_markup(darslar, page):
+    """Sahifa klaviaturasi (darslar katalogda sort_key tartibida)"""
+    total_pages, start_idx, current_darslar = _page_bounds(darslar, page)
 
     markup = ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
 
@@ -224,23 +242,29 @@ async def show_darslar_page(message, user_id):
         KeyboardButton("🔙 Mavzular"),
         KeyboardButton("🏠 Menu")
     )
+    return markup
+
+
+def build_darslar_text(faculty_name, mavzu_name, darslar, page):
+    """Sahifa matni - joriy yuklanish sonlari bilan"""
+    total_pages, start_idx, current_darslar = _page_bounds(darslar, page)
 
     # Darslar ro'yxatini matn sifatida
     dars_list = ""
     for idx, dars in enumerate(current_darslar):
         dars_number = start_idx + idx + 1
         title = dars['title'][:40]
-        downloads = dars['count_download']
+        # Fayl izohidagi bilan bir xil manba - keshdagi son + yozilmaganlar
+        downloads = counter_buffer.downloads(dars)
         dars_list += f"{dars_number}. {title} ({downloads}📥)\n"
 
     text = (
         f"📚 <b>{faculty_name}</b>\n"
         f"📖 <b>{mavzu_name}</b>\n\n"
         f"{dars_list}\n"
-        f"📊 Jami: {len(darslar_sorted)} ta | Sahifa: {page + 1}/{total_pages}"
+        f"📊 Jami: {len(darslar)} ta | Sahifa: {page + 1}/{total_pages}"
     )
-
-    await message.answer(text, reply_markup=markup, parse_mode="HTML")
+    return text
 
 
 # ==================== SAHIFA NAVIGATSIYA ====================
@@ -252,43 +276,64 @@ async def navigate_pages(message: types.Message):
 
     user_id = message.from_user.id
 
-    if user_id not in user_pagination:
+    session = get_session(user_id)
+    if session is None:
         await message.answer("❌ Xato. Qaytadan mavzu tanlang.")
         return
 
-    data = user_pagination[user_id]
-    total_pages = (len(data['darslar']) + DARS_PER_PAGE - 1) // DARS_PER_PAGE
+    darslar = await dars_db.catalog.darslar_async(session.fakultet_id, session.mavzu)
+    total_pages = (len(darslar) + DARS_PER_PAGE - 1) // DARS_PER_PAGE
 
     if message.text == "Keyingi ➡️":
-        if data['page'] < total_pages - 1:
-            data['page'] += 1
+        if session.page < total_pages - 1:
+            session.page += 1
     elif message.text == "⬅️ Oldingi":
-        if data['page'] > 0:
-            data['page'] -= 1
+        if session.page > 0:
+            session.page -= 1
 
     await show_darslar_page(message, user_id)
 
 
+# ==================== FAYL YUBORISH ====================
+async def send_dars_file(message, selected, user_id):
+    """Dars faylini yuborish va statistikani yozish"""
+    try:
+        downloads = counter_buffer.downloads(selected) + 1
+        await message.answer_document(
+            document=selected['file_id'],
+            caption=(
+                f"📚 <b>{selected['title']}</b>\n\n"
+                f"🔢 Kod: <code>{selected['code']}</code>\n"
+                f"📥 Yuklanish: {downloads}\n"
+                f"📅 {format_date(selected['created_at'])}"
+            ),
+            parse_mode="HTML"
+        )
+
+        # Statistika (bufer orqali, davriy yoziladi)
+        counter_buffer.add_download(selected['code'], user_id)
+
+        logger.info(f"📥 Download: {selected['code']} by {user_id}")
+
+    except Exception as e:
+        logger.error(f"Fayl yuborish xatosi: {e}")
+        await message.answer(f"❌ Xatolik: {e}")
+
+
 # ==================== DARS RAQAMI ORQALI TANLASH ====================
 @dp.message_handler(lambda m: m.text and m.text.isdigit())
 async def select_dars_by_number(message: types.Message):
     """Raqam orqali dars tanlash"""
     user_id = message.from_user.id
 
-    if user_id not in user_pagination:
+    session = get_session(user_id)
+    if session is None:
         return
 
     dars_number = int(message.text)
-    data = user_pagination[user_id]
 
-    # Darslarni saralash (xuddi ko'rsatilgandek)
-    import re
-    def natural_sort_key(dars):
-        title = dars['title']
-        parts = re.split(r'(\d+)', title)
-        return [int(part) if part.isdigit() else part.lower() for part in parts]
-
-    darslar = sorted(data['darslar'], key=natural_sort_key)
+    # Katalogdagi ro'yxat ko'rsatilgan tartibda - raqam to'g'ridan-to'g'ri indeks
+    darslar = await dars_db.catalog.darslar_async(session.fakultet_id, session.mavzu)
 
     # Dars indeksini hisoblash
     dars_index = dars_number - 1
@@ -297,36 +342,8 @@ async def select_dars_by_number(message: types.Message):
         await message.answer("❌ Noto'g'ri raqam")
         return
 
-    selected_dars = darslar[dars_index]
-    selected = dars_db.search_dars_by_code(selected_dars['code'])
-
-    if not selected:
-        await message.answer("❌ Dars topilmadi")
-        return
-
-    # Faylni yuborish
-    try:
-        await message.answer_document(
-            document=selected['file_id'],
-            caption=(
-                f"📚 <b>{selected['title']}</b>\n\n"
-                f"🔢 Kod: <code>{selected['code']}</code>\n"
-                f"📥 Yuklanish: {selected['count_download'] + 1}\n"
-                f"📅 {selected['created_at'][:10]}"
-            ),
-            parse_mode="HTML"
-        )
-
-        # Statistika
-        dars_db.update_download_count(selected['code'])
-        user_db.increment_downloads(message.from_user.id)
-        user_db.update_last_active(message.from_user.id)
-
-        logger.info(f"📥 Download: {selected['code']} by {message.from_user.id}")
-
-    except Exception as e:
-        logger.error(f"Fayl yuborish xatosi: {e}")
-        await message.answer(f"❌ Xatolik: {e}")
+    selected = darslar[dars_index]
+    await send_dars_file(message, selected, message.from_user.id)
 
 
 # ==================== DARS TANLASH ====================
@@ -338,27 +355,22 @@ async def select_dars(message: types.Message):
     dars_title = dars_text.split(" (")[0].strip() if " (" in dars_text else dars_text.strip()
 
     # Fakultet
-    faculty = user_db.get_user_faculty(message.from_user.id)
+    faculty = await user_db.get_user_faculty_async(message.from_user.id)
     if not faculty:
         await message.answer("❌ Avval fakultetni tanlang")
         return
 
     # Fakultet ID
-    fakultetlar = dars_db.get_all_fakultetlar()
-    fakultet_id = None
-    for fak in fakultetlar:
-        if fak['name'] == faculty:
-            fakultet_id = fak['id']
-            break
+    fakultet_id = await dars_db.catalog.fakultet_id_async(faculty)
 
-    # Darsni topish - yangilangan qidiruv
-    all_darslar = dars_db.get_dars_by_fakultet(fakultet_id)
+    # Darsni topish - keshdagi darslar ichidan
+    all_darslar = await dars_db.catalog.all_darslar_async(fakultet_id) if fakultet_id else []
     selected = None
 
     # Avval to'liq nom bo'yicha qidirish
     for dars in all_darslar:
         if dars['title'] == dars_title:
-            selected = dars_db.search_dars_by_code(dars['code'])
+            selected = dars
             break
 
     # Agar topilmasa, qisqartirilgan nom bo'yicha qidirish
@@ -367,36 +379,14 @@ async def select_dars(message: types.Message):
             # Dars nomini 50 belgigacha qisqartirish (klaviaturadagi kabi)
             short_title = dars['title'][:50]
             if short_title == dars_title or dars['title'].startswith(dars_title):
-                selected = dars_db.search_dars_by_code(dars['code'])
+                selected = dars
                 break
 
     if not selected:
         await message.answer("❌ Dars topilmadi")
         return
 
-    # Faylni yuborish
-    try:
-        await message.answer_document(
-            document=selected['file_id'],
-            caption=(
-                f"📚 <b>{selected['title']}</b>\n\n"
-                f"🔢 Kod: <code>{selected['code']}</code>\n"
-                f"📥 Yuklanish: {selected['count_download'] + 1}\n"
-                f"📅 {selected['created_at'][:10]}"
-            ),
-            parse_mode="HTML"
-        )
-
-        # Statistika
-        dars_db.update_download_count(selected['code'])
-        user_db.increment_downloads(message.from_user.id)
-        user_db.update_last_active(message.from_user.id)
-
-        logger.info(f"📥 Download: {selected['code']} by {message.from_user.id}")
-
-    except Exception as e:
-        logger.error(f"Fayl yuborish xatosi: {e}")
-        await message.answer(f"❌ Xatolik: {e}")
+    await send_dars_file(message, selected, message.from_user.id)
 
 
 # ==================== NAVIGATSIYA ====================
@@ -404,12 +394,11 @@ async def select_dars(message: types.Message):
 async def back_to_faculties(message: types.Message):
     """Fakultetlarga qaytish"""
     # Sahifalash ma'lumotlarini tozalash
-    if message.from_user.id in user_pagination:
-        del user_pagination[message.from_user.id]
+    user_sessions.pop(message.from_user.id)
 
     await message.answer(
         "🎓 Fakultetingizni tanlang:",
-        reply_markup=faculty_menu
+        reply_markup=await get_faculty_menu()
     )
 
 
@@ -417,51 +406,43 @@ async def back_to_faculties(message: types.Message):
 async def back_to_mavzular(message: types.Message):
     """Mavzularga qaytish"""
     # Sahifalash ma'lumotlarini tozalash
-    if message.from_user.id in user_pagination:
-        del user_pagination[message.from_user.id]
+    user_sessions.pop(message.from_user.id)
 
-    faculty = user_db.get_user_faculty(message.from_user.id)
+    faculty = await user_db.get_user_faculty_async(message.from_user.id)
     if not faculty:
-        await message.answer("❌ Xato", reply_markup=faculty_menu)
+        await message.answer("❌ Xato", reply_markup=await get_faculty_menu())
         return
 
-    fakultetlar = dars_db.get_all_fakultetlar()
-    fakultet_id = None
-    for fak in fakultetlar:
-        if fak['name'] == faculty:
-            fakultet_id = fak['id']
-            break
+    fakultet_id = await dars_db.catalog.fakultet_id_async(faculty)
 
     if fakultet_id:
         await show_mavzular(message, fakultet_id, faculty)
     else:
-        await message.answer("❌ Xato", reply_markup=faculty_menu)
+        await message.answer("❌ Xato", reply_markup=await get_faculty_menu())
 
 
 @dp.message_handler(text="🏠 Menu")
 async def main_menu_short(message: types.Message):
     """Asosiy menyu (qisqa)"""
     # Sahifalash ma'lumotlarini tozalash
-    if message.from_user.id in user_pagination:
-        del user_pagination[message.from_user.id]
+    user_sessions.pop(message.from_user.id)
 
-    if message.from_user.id in ADMINS or user_db.check_if_admin(message.from_user.id):
+    if user_db.is_admin(message.from_user.id):
         await message.answer("👑 Admin panel:", reply_markup=admin_menu)
     else:
-        await message.answer("🎓 Fakultetingizni tanlang:", reply_markup=faculty_menu)
+        await message.answer("🎓 Fakultetingizni tanlang:", reply_markup=await get_faculty_menu())
 
 
 @dp.message_handler(text="🏠 Asosiy menyu")
 async def main_menu(message: types.Message):
     """Asosiy menyu"""
     # Sahifalash ma'lumotlarini tozalash
-    if message.from_user.id in user_pagination:
-        del user_pagination[message.from_user.id]
+    user_sessions.pop(message.from_user.id)
 
-    if message.from_user.id in ADMINS or user_db.check_if_admin(message.from_user.id):
+    if user_db.is_admin(message.from_user.id):
         await message.answer("👑 Admin panel:", reply_markup=admin_menu)
     else:
-        await message.answer("🎓 Fakultetingizni tanlang:", reply_markup=faculty_menu)
+        await message.answer("🎓 Fakultetingizni tanlang:", reply_markup=await get_faculty_menu())
 
 
 @dp.message_handler(text="📞 Yordam")
@@ -473,4 +454,57 @@ async def support(message: types.Message):
         "📱 @anvarcode\n\n"
         "🔰 Savol-javoblar uchun admin bilan bog'laning",
         parse_mode="HTML"
-    )
\ No newline at end of file
+    )
+
+
+# ==================== QIDIRUV ====================
+SEARCH_LIMIT = 10
+
+
+async def search_lessons(message: types.Message):
+    """Erkin matnli qidiruv - fakultet ichida, bm25 bo'yicha"""
+    query = message.text.strip()
+    if len(query) < 2 or query.startswith("/"):
+        return
+
+    fakultet_id = None
+    faculty = await user_db.get_user_faculty_async(message.from_user.id)
+    if faculty:
+        fakultet_id = await dars_db.catalog.fakultet_id_async(faculty)
+
+    results = await dars_db.search_lessons_async(query, fakultet_id, limit=SEARCH_LIMIT)
+    # Foydalanuvchi matni va nomlarda "<", "&" bo'lishi mumkin - HTML rejim buzilmasin
+    safe_query = quote_html(query)
+    if not results:
+        await message.answer(f"🔍 <b>{safe_query}</b>\n\n❌ Hech narsa topilmadi", parse_mode="HTML")
+        return
+
+    markup = InlineKeyboardMarkup(row_width=1)
+    text = f"🔍 <b>{safe_query}</b>\n\n"
+    for idx, dars in enumerate(results, 1):
+        mavzu = quote_html(dars['mavzu_name'] or "Boshqa")
+        text += f"{idx}. {quote_html(dars['title'][:40])} — <i>{mavzu}</i> ({dars['count_download']}📥)\n"
+        markup.add(InlineKeyboardButton(
+            f"📥 {idx}. {dars['title'][:35]}",
+            callback_data=f"dars_{dars['id']}"
+        ))
+
+    await message.answer(text, reply_markup=markup, parse_mode="HTML")
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith("dars_"))
+async def download_from_search(call: types.CallbackQuery):
+    """Qidiruv natijasidan yuklash"""
+    await call.answer()
+    selected = await dars_db.search_dars_by_id_async(int(call.data.split("_")[1]))
+
+    if not selected:
+        await call.message.answer("❌ Dars topilmadi")
+        return
+
+    await send_dars_file(call.message, selected, call.from_user.id)
+
+
+def register_search_handler(dp):
+    """Qidiruv handleri boshqa barcha matnli handlerlardan keyin turishi kerak"""
+    dp.register_message_handler(search_lessons, content_types=types.ContentType.TEXT)
@@ -5,20 +5,33 @@ from aiogram.dispatcher.middlewares import BaseMiddleware
 from aiogram.utils.exceptions import MessageNotModified, BotBlocked, ChatNotFound, UserDeactivated
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from data.config import ADMINS
-from loader import bot, user_db, channel_db, dp
+from loader import user_db, dp, activity_tracker, subscription_service
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ActivityMiddleware(BaseMiddleware):
+    """Foydalanuvchi faolligi (last_active) - har bir xabar va tugma bosilishi
+
+    pre_process da ishlaydi: keyingi middleware yangilanishni bekor qilsa ham
+    faollik hisoblanadi. touch() DB ga murojaat qilmaydi, oynada bir marta yoziladi.
+    """
+
+    async def on_pre_process_update(self, update: types.Update, data: dict):
+        user = None
+        if update.message:
+            user = update.message.from_user
+        elif update.callback_query:
+            user = update.callback_query.from_user
+
+        if user:
+            activity_tracker.touch(user.id)
+
+
 class SubscriptionMiddleware(BaseMiddleware):
     """Obuna majburiy middleware - State support bilan"""
 
-    # Cache uchun
-    _subscription_cache = {}
-    _cache_duration = 30  # 30 soniya
-
     # Obuna shart bo'lmagan buyruqlar
     ALLOWED_COMMANDS = {'/start', '/help', '/admin', '/cancel'}
     ALLOWED_CALLBACKS = {
@@ -28,9 +41,6 @@ class SubscriptionMiddleware(BaseMiddleware):
         'invalid_channel'
     }
 
-
-
-
     async def on_pre_process_update(self, update: types.Update, data: dict):
         """Har bir yangilanish oldidan bajariladi"""
         try:
@@ -58,9 +68,10 @@ class SubscriptionMiddleware(BaseMiddleware):
             if await self._is_allowed_action(update, user_id, chat_id):
                 return
 
-            # Obuna tekshiruvi
-            if not await self._check_subscription(user_id):
-                await self._handle_unsubscribed_user(user_id, message, update)
+            # Obuna tekshiruvi - bitta o'tishda ham hukm, ham klaviatura uchun
+            unsubscribed = await self._get_unsubscribed_channels(user_id)
+            if unsubscribed:
+                await self._handle_unsubscribed_user(user_id, message, update, unsubscribed)
                 raise CancelHandler()
 
         except CancelHandler:
@@ -109,15 +120,8 @@ class SubscriptionMiddleware(BaseMiddleware):
     async def _is_admin(self, user_id: int) -> bool:
         """Admin tekshiruvi"""
         try:
-            # Config adminlar
-            if isinstance(ADMINS, list) and user_id in ADMINS:
-                return True
-
-            # Database adminlar
-            if user_db and user_db.check_if_admin(user_id):
-                return True
-
-            return False
+            # Config va DB adminlar - xotiradagi to'plam
+            return user_db.is_admin(user_id)
         except Exception as e:
             logger.error(f"Admin tekshirish xatolik: {e}")
             return False
@@ -183,69 +187,15 @@ class SubscriptionMiddleware(BaseMiddleware):
     async def _check_subscription(self, user_id: int) -> bool:
         """Obuna holatini tekshirish"""
         try:
-            # Cache dan tekshirish
-            import time
-            current_time = time.time()
-
-            if user_id in self._subscription_cache:
-                cache_data = self._subscription_cache[user_id]
-                if current_time - cache_data['timestamp'] < self._cache_duration:
-                    return cache_data['subscribed']
-
-            # Database dan kanallarni olish
-            if not channel_db:
-                return True
-
-            channels = channel_db.get_all_channels()
-            if not channels:
-                return True
-
-            # Har bir kanalga obuna tekshirish
-            for channel_id, _, _ in channels:
-                if not await self._check_single_channel(user_id, channel_id):
-                    # Cache ga saqlash
-                    self._subscription_cache[user_id] = {
-                        'subscribed': False,
-                        'timestamp': current_time
-                    }
-                    return False
-
-            # Barcha kanallarga obuna
-            self._subscription_cache[user_id] = {
-                'subscribed': True,
-                'timestamp': current_time
-            }
-            return True
-
+            return await subscription_service.is_subscribed(user_id)
         except Exception as e:
             logger.error(f"Obuna tekshirish xatolik: {e}")
             return True  # Xatolik bo'lsa ruxsat berish
 
-    async def _check_single_channel(self, user_id: int, channel_id: int) -> bool:
-        """Bitta kanalga obuna tekshirish"""
-        try:
-            member = await bot.get_chat_member(chat_id=channel_id, user_id=user_id)
-            return member.status in ["member", "administrator", "creator"]
-        except Exception as e:
-            logger.warning(f"Kanal {channel_id} tekshirish xatolik: {e}")
-            return False
-
     async def _get_unsubscribed_channels(self, user_id: int) -> list:
-        """Obuna bo'lmagan kanallar ro'yxati"""
+        """Obuna bo'lmagan kanallar ro'yxati (bitta o'tishda, umumiy keshdan)"""
         try:
-            if not channel_db:
-                return []
-
-            channels = channel_db.get_all_channels()
-            if not channels:
-                return []
-
-            unsubscribed = []
-            for channel_id, title, link in channels:
-                if not await self._check_single_channel(user_id, channel_id):
-                    unsubscribed.append((link, title))
-
-            return unsubscribed
+            return await subscription_service.get_unsubscribed(user_id)
         except Exception as e:
             logger.error(f"Obuna bo'lmagan kanallar xatolik: {e}")
             return []
@@ -291,10 +241,12 @@ class SubscriptionMiddleware(BaseMiddleware):
         except Exception as e:
             logger.error(f"Guruh javob xatolik: {e}")
 
-    async def _handle_unsubscribed_user(self, user_id: int, message: types.Message, update: types.Update):
+    async def _handle_unsubscribed_user(self, user_id: int, message: types.Message, update: types.Update,
+                                        unsubscribed: list = None):
         """Obuna bo'lmagan foydalanuvchini boshqarish"""
         try:
-            unsubscribed = await self._get_unsubscribed_channels(user_id)
+            if unsubscribed is None:
+                unsubscribed = await self._get_unsubscribed_channels(user_id)
 
             if not unsubscribed:
                 logger.warning("Obuna kanallar yo'q, lekin middleware ishlayabdi")
@@ -357,38 +309,13 @@ class SubscriptionMiddleware(BaseMiddleware):
             except Exception as e2:
                 logger.error(f"Fallback xabar ham yuborilmadi: {e2}")
 
-    async def on_post_process_update(self, update: types.Update, result, data: dict):
-        """Update dan keyin bajariladigan ishlar"""
-        try:
-            # Foydalanuvchi faolligini yangilash
-            user_id = None
-            if update.message:
-                user_id = update.message.from_user.id
-            elif update.callback_query:
-                user_id = update.callback_query.from_user.id
-
-            if user_id and user_db and user_db.select_user(user_id):
-                user_db.update_last_active(user_id)
-
-        except Exception as e:
-            logger.error(f"Post process xatolik: {e}")
-
     def clear_cache(self):
         """Cache ni tozalash"""
-        self._subscription_cache.clear()
+        subscription_service.clear_cache()
 
     def get_cache_stats(self) -> dict:
         """Cache statistikasi"""
-        import time
-        current_time = time.time()
-        active_cache = 0
-
-        for user_data in self._subscription_cache.values():
-            if current_time - user_data['timestamp'] < self._cache_duration:
-                active_cache += 1
-
-        return {
-            'total_cached': len(self._subscription_cache),
-            'active_cache': active_cache,
-            'cache_duration': self._cache_duration
-        }
\ No newline at end of file
+        return subscription_service.get_cache_stats()
+
+
+dp.middleware.setup(ActivityMiddleware())
@@ -1,12 +1,16 @@
 import datetime
 import asyncio
+import logging
 from data.config import ADMINS
-from loader import bot, dp, user_db
+from loader import bot, dp, user_db, broadcast_db, blocked_users
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.dispatcher.filters import Text
-from aiogram.utils.exceptions import BotBlocked, ChatNotFound, RetryAfter, Unauthorized
+from utils.broadcast import Broadcaster
+from utils.db_api.fsm_storage import dump_data, load_data
+
+logger = logging.getLogger(__name__)
 
 # Reklama yuborish jarayonlarini saqlash uchun ro'yxat
 advertisements = []
@@ -18,21 +22,75 @@ class ReklamaTuriState(StatesGroup):
     content = State()
     buttons = State()
 
+def audience_filter(max_user_id):
+    """Reklama auditoriyasi: surat ichidagi, bloklanmagan foydalanuvchilar (shart, parametrlar)"""
+    return "is_blocked=0 AND id <= ?", (max_user_id,)
+
+
 class Advertisement:
-    def __init__(self, ad_id, message, ad_type, keyboard=None, send_time=None, creator_id=None):
+    STATUS_INTERVAL = 5  # Holat xabarini yangilash oralig'i (soniya)
+    BATCH_SIZE = 200  # Checkpoint oralig'i - qulashda ko'pi bilan shuncha takrorlanadi
+
+    def __init__(self, ad_id, message, ad_type, keyboard=None, send_time=None, creator_id=None,
+                 max_user_id=0, cursor=0, total_users=0, sent=0, failed=0, retried=0):
         self.ad_id = ad_id
         self.message = message
         self.ad_type = ad_type
         self.keyboard = keyboard
         self.send_time = send_time
         self.creator_id = creator_id
+        self.max_user_id = max_user_id  # Auditoriya surati (0 - hali olinmagan)
+        self.cursor = cursor  # Oxirgi yuborilgan partiya
         self.running = False
-        self.paused = False
-        self.sent_count = 0
-        self.failed_count = 0
-        self.total_users = 0
+        self.stopped = False
+        self.total_users = total_users
         self.current_message = None  # Admin bilan aloqa uchun xabar
         self.task = None
+        self.broadcaster = Broadcaster(
+            lambda chat_id: send_advertisement_to_user(chat_id, self),
+            on_dead=blocked_users.mark_blocked
+        )
+        self.broadcaster.sent = sent
+        self.broadcaster.failed = failed
+        self.broadcaster.retried = retried
+
+    @classmethod
+    async def create(cls, message, ad_type, keyboard=None, send_time=None, creator_id=None):
+        """Yangi reklama - vazifa DB ga yoziladi (auditoriya yuborish boshlanganda olinadi)"""
+        ad_id = await broadcast_db.create_job_async(
+            creator_id, ad_type,
+            dump_data({'message': message, 'keyboard': keyboard}),
+            int(send_time.timestamp()) if send_time else None
+        )
+        return cls(ad_id, message, ad_type, keyboard, send_time, creator_id)
+
+    @classmethod
+    def from_job(cls, job):
+        """DB dagi vazifadan tiklash"""
+        payload = load_data(job['payload'])
+        send_time = datetime.datetime.fromtimestamp(job['send_time']) if job['send_time'] else None
+        return cls(
+            job['id'], payload['message'], job['ad_type'], payload.get('keyboard'), send_time,
+            job['creator_id'], max_user_id=job['max_user_id'], cursor=job['cursor'],
+            total_users=job['total'], sent=job['sent'], failed=job['failed'],
+            retried=job['retried']
+        )
+
+    @property
+    def paused(self):
+        return self.broadcaster.paused
+
+    @property
+    def sent_count(self):
+        return self.broadcaster.sent
+
+    @property
+    def failed_count(self):
+        return self.broadcaster.failed
+
+    @property
+    def retried_count(self):
+        return self.broadcaster.retried
 
     async def start(self):
         self.running = True
@@ -40,57 +98,103 @@ class Advertisement:
             delay = (self.send_time - datetime.datetime.now()).total_seconds()
             if delay > 0:
                 await asyncio.sleep(delay)
-        users = user_db.select_all_users()
-        self.total_users = len(users)
+        if self.stopped:
+            return
+        if not self.max_user_id:
+            await self._snapshot_audience()
+        if not self.paused:
+            await broadcast_db.set_status_async(self.ad_id, 'running')
         self.current_message = await bot.send_message(
             chat_id=self.creator_id,
-            text=f"Reklama #{self.ad_id} yuborish boshlandi.\nYuborilgan: {self.sent_count}\nYuborilmagan: {self.failed_count}\nUmumiy: {self.sent_count + self.failed_count}/{self.total_users}\n\nStatus: Davom etmoqda",
-            reply_markup=get_status_keyboard(self.ad_id)
+            text=f"Reklama #{self.ad_id} yuborish {'davom ettirildi' if self.cursor else 'boshlandi'}.\nYuborilgan: {self.sent_count}\nYuborilmagan: {self.failed_count}\nQayta urinish: {self.retried_count}\nUmumiy: {self.sent_count + self.failed_count}/{self.total_users}\n\nStatus: {'Pauza holatida' if self.paused else 'Davom etmoqda'}",
+            reply_markup=get_status_keyboard(self.ad_id, self.paused)
         )
-        for user in users:
-            if not self.running:
-                break
-            while self.paused:
-                await asyncio.sleep(1)
-                if not self.running:
-                    break
-            if not self.running:
-                break
+        reporter = asyncio.create_task(self._report_status())
+        try:
+            await self.broadcaster.run(
+                user_db.iter_user_id_batches_async(
+                    self.cursor, self.BATCH_SIZE, where=audience_filter(self.max_user_id)
+                ),
+                on_batch=self._checkpoint
+            )
+        finally:
+            reporter.cancel()
+            self.running = False
+        if not self.stopped:
+            await broadcast_db.set_status_async(self.ad_id, 'finished')
+            await self.update_status_message(finished=True)
+
+    async def _snapshot_audience(self):
+        """Auditoriya surati - yuborish boshlanganda; qayta ishga tushganda shu chegara ishlatiladi"""
+        self.max_user_id = await user_db.get_max_user_id_async()
+        self.total_users = await user_db.count_users_where_async(audience_filter(self.max_user_id))
+        await broadcast_db.set_audience_async(self.ad_id, self.max_user_id, self.total_users)
+
+    async def _checkpoint(self, cursor):
+        """Partiya tugadi - qayta ishga tushganda shu yerdan davom etiladi"""
+        self.cursor = cursor
+        try:
+            await broadcast_db.checkpoint_async(
+                self.ad_id, cursor, self.sent_count, self.failed_count, self.retried_count
+            )
+        except Exception as e:
+            logger.error(f"Reklama #{self.ad_id} checkpoint xatosi: {e}")
+
+    async def _report_status(self):
+        """Holat xabarini davriy yangilash (har yuborishda emas - edit chegarasi)"""
+        last = None
+        while True:
+            await asyncio.sleep(self.STATUS_INTERVAL)
+            current = (self.sent_count, self.failed_count, self.retried_count, self.paused)
+            if current == last:
+                continue
+            last = current
             try:
-                await send_advertisement_to_user(user[1], self)
-                self.sent_count += 1
-            except (BotBlocked, ChatNotFound, Unauthorized):
-                self.failed_count += 1
-            except RetryAfter as e:
-                await asyncio.sleep(e.timeout)
-            await asyncio.sleep(0.1)
-            if self.sent_count % 10 == 0:
                 await self.update_status_message()
-        self.running = False
-        self.paused = False
-        await self.update_status_message(finished=True)
+            except Exception:
+                pass  # Keyingi safar
 
     async def pause(self):
-        self.paused = True
+        self.broadcaster.pause()
+        await broadcast_db.set_status_async(self.ad_id, 'paused')
         await self.update_status_message()
 
     async def resume(self):
-        self.paused = False
+        self.broadcaster.resume()
+        await broadcast_db.set_status_async(self.ad_id, 'running')
         await self.update_status_message()
 
     async def stop(self):
-        self.running = False
+        self.stopped = True
+        self.broadcaster.stop()
+        await broadcast_db.set_status_async(self.ad_id, 'stopped')
         await self.update_status_message(stopped=True)
 
     async def update_status_message(self, finished=False, stopped=False):
         status = "Yakunlandi" if finished else ("To'xtatildi" if stopped else ("Pauza holatida" if self.paused else "Davom etmoqda"))
         if self.current_message:
             await self.current_message.edit_text(
-                text=f"Reklama #{self.ad_id}\nYuborilgan: {self.sent_count}\nYuborilmagan: {self.failed_count}\nUmumiy: {self.sent_count + self.failed_count}/{self.total_users}\n\nStatus: {status}",
+                text=f"Reklama #{self.ad_id}\nYuborilgan: {self.sent_count}\nYuborilmagan: {self.failed_count}\nQayta urinish: {self.retried_count}\nUmumiy: {self.sent_count + self.failed_count}/{self.total_users}\n\nStatus: {status}",
                 reply_markup=None if finished or stopped else get_status_keyboard(self.ad_id, self.paused)
             )
 
 
+async def resume_advertisements():
+    """Tugamagan reklamalarni oxirgi checkpointdan davom ettirish (bot ishga tushganda)"""
+    for job in await broadcast_db.get_active_jobs_async():
+        try:
+            advertisement = Advertisement.from_job(job)
+        except Exception as e:
+            logger.error(f"Reklama #{job['id']} ni tiklab bo'lmadi: {e}")
+            await broadcast_db.set_status_async(job['id'], 'failed')
+            continue
+        if job['status'] == 'paused':
+            advertisement.broadcaster.pause()
+        advertisements.append(advertisement)
+        advertisement.task = asyncio.create_task(advertisement.start())
+        logger.info(f"📣 Reklama #{advertisement.ad_id} davom ettirildi (kursor: {advertisement.cursor})")
+
+
 async def send_advertisement_to_user(chat_id, advertisement: Advertisement):
     message = advertisement.message
     ad_type = advertisement.ad_type
@@ -144,12 +248,7 @@ async def check_super_admin_permission(telegram_id: int):
     return telegram_id in ADMINS
 
 async def check_admin_permission(telegram_id: int):
-    user = user_db.select_user(telegram_id=telegram_id)
-    if not user:
-        return False
-    user_id = user[0]
-    admin = user_db.check_if_admin(user_id=user_id)
-    return admin
+    return user_db.is_admin(telegram_id)
 
 @dp.message_handler(text="📣 Reklama")
 async def reklama_handler(message: types.Message):
@@ -244,9 +343,7 @@ async def confirm_ad_handler(callback_query: types.CallbackQuery, state: FSMCont
     ad_content = data.get('ad_content')
     keyboard = data.get('keyboard')
     send_time = data.get('send_time_value') if data.get('send_time') == 'send_later' else None
-    ad_id = len(advertisements) + 1
-    advertisement = Advertisement(
-        ad_id=ad_id,
+    advertisement = await Advertisement.create(
         message=ad_content,
         ad_type=ad_type,
         keyboard=keyboard,
@@ -255,7 +352,7 @@ async def confirm_ad_handler(callback_query: types.CallbackQuery, state: FSMCont
     )
     advertisements.append(advertisement)
     await state.finish()
-    await callback_query.message.edit_text(f"Reklama #{ad_id} yuborish jadvalga qo'shildi.")
+    await callback_query.message.edit_text(f"Reklama #{advertisement.ad_id} yuborish jadvalga qo'shildi.")
     advertisement.task = asyncio.create_task(advertisement.start())
 
 @dp.callback_query_handler(lambda c: c.data.startswith("pause_ad_"))
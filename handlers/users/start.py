@@ -7,47 +7,22 @@ from aiogram.dispatcher.filters import CommandStart
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from data.config import ADMINS, STICKERS
 from keyboards.default.admin_menu import admin_menu
-from keyboards.inline.fakultet import faculty_menu,FACULTY_MAPPING
-from loader import dp, bot, user_db, channel_db
-import asyncio
+from keyboards.inline.fakultet import get_faculty_menu
+from loader import dp, bot, user_db, channel_db, activity_tracker, subscription_service, subscription_watcher
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 # ==================== OBUNA TEKSHIRISH ====================
-async def check_channel_subscription(user_id: int, channel_id: int) -> bool:
-    """Bitta kanal tekshirish"""
-    try:
-        member = await bot.get_chat_member(chat_id=channel_id, user_id=user_id)
-        return member.status in ["member", "administrator", "creator"]
-    except Exception as e:
-        logger.warning(f"Kanal tekshirish xatosi {channel_id}: {e}")
-        return False
-
-
-async def check_all_subscriptions(user_id: int) -> bool:
+async def check_all_subscriptions(user_id: int, fresh: bool = False) -> bool:
     """Barcha kanallar tekshirish"""
-    channels = channel_db.get_all_channels()
-    if not channels:
-        return True
+    return await subscription_service.is_subscribed(user_id, fresh)
 
-    for channel_id, _, _ in channels:
-        if not await check_channel_subscription(user_id, channel_id):
-            return False
-    return True
 
-
-async def get_unsubscribed_channels(user_id: int) -> list:
+async def get_unsubscribed_channels(user_id: int, fresh: bool = False) -> list:
     """Obuna bo'lmagan kanallar"""
-    channels = channel_db.get_all_channels()
-    unsubscribed = []
-
-    for channel_id, title, link in channels:
-        if not await check_channel_subscription(user_id, channel_id):
-            unsubscribed.append((link, title))
-
-    return unsubscribed
+    return await subscription_service.get_unsubscribed(user_id, fresh)
 
 
 def build_subscription_keyboard(unsubscribed: list) -> InlineKeyboardMarkup:
@@ -69,14 +44,14 @@ def build_subscription_keyboard(unsubscribed: list) -> InlineKeyboardMarkup:
 async def register_user(user_id, username, first_name, last_name):
     """Foydalanuvchini ro'yxatga olish"""
     try:
-        user = user_db.select_user(user_id)
+        user = await user_db.select_user_async(user_id)
 
         if not user:
-            user_db.add_user(user_id, username, first_name, last_name)
+            await user_db.add_user_async(user_id, username, first_name, last_name)
             logger.info(f"➕ Yangi user: {user_id}")
 
             # Adminlarga xabar
-            total = user_db.count_users()
+            total = await user_db.count_users_async()
             for admin_id in ADMINS:
                 try:
                     await bot.send_sticker(admin_id, STICKERS['new_user'])
@@ -92,8 +67,8 @@ async def register_user(user_id, username, first_name, last_name):
                 except:
                     pass
         else:
-            user_db.update_user_info(user_id, username, first_name, last_name)
-            user_db.update_last_active(user_id)
+            await user_db.update_user_info_async(user_id, username, first_name, last_name)
+            activity_tracker.touch(user_id)
 
         return True
     except Exception as e:
@@ -102,33 +77,25 @@ async def register_user(user_id, username, first_name, last_name):
 
 
 # ==================== AVTOMATIK TEKSHIRUV ====================
-async def auto_check_subscription(user_id: int, message: types.Message):
-    """Avtomatik obuna tekshirish"""
-    for attempt in range(60):
-        await asyncio.sleep(3)
-
-        try:
-            if await check_all_subscriptions(user_id):
-                await message.edit_text(
-                    "✅ <b>Tabriklaymiz!</b>\n\n"
-                    "🎓 Botga xush kelibsiz!\n"
-                    "📚 Fakultetingizni tanlang:",
-                    reply_markup=faculty_menu,
-                    parse_mode="HTML"
-                )
-                return
-        except:
-            break
-
-    # Vaqt tugadi
-    try:
+def auto_check_subscription(user_id: int, message: types.Message):
+    """Avtomatik obuna tekshirish - umumiy rejalashtiruvchiga topshiriladi"""
+    async def on_success():
+        await message.edit_text(
+            "✅ <b>Tabriklaymiz!</b>\n\n"
+            "🎓 Botga xush kelibsiz!\n"
+            "📚 Fakultetingizni tanlang:",
+            reply_markup=await get_faculty_menu(),
+            parse_mode="HTML"
+        )
+
+    async def on_timeout():
         await message.edit_text(
             "⏰ <b>Vaqt tugadi</b>\n\n"
             "🔄 Qaytadan /start bosing",
             parse_mode="HTML"
         )
-    except:
-        pass
+
+    subscription_watcher.watch(user_id, on_success, on_timeout)
 
 
 # ==================== START HANDLER ====================
@@ -147,14 +114,15 @@ async def start_handler(message: types.Message):
         return
 
     # Admin tekshirish
-    if user_id in ADMINS or user_db.check_if_admin(user_id):
+    if user_db.is_admin(user_id):
+        stats = await user_db.get_dashboard_snapshot_async()
         await message.answer(
             f"👑 <b>Admin Panel</b>\n\n"
             f"Salom, {full_name}!\n\n"
             f"📊 Statistika:\n"
-            f"• Jami: {user_db.count_users()} ta\n"
-            f"• Bugun: +{user_db.count_daily_users()} ta\n"
-            f"• Faol: {user_db.count_active_daily_users()} ta",
+            f"• Jami: {stats['total']} ta\n"
+            f"• Bugun: +{stats['daily']} ta\n"
+            f"• Faol: {stats['active_daily']} ta",
             reply_markup=admin_menu,
             parse_mode="HTML"
         )
@@ -166,7 +134,7 @@ async def start_handler(message: types.Message):
         return
 
     # Kanallar tekshirish
-    channels = channel_db.get_all_channels()
+    channels = await channel_db.get_all_channels_async()
 
     if not channels:
         # Kanallar yo'q
@@ -174,23 +142,23 @@ async def start_handler(message: types.Message):
             f"🎓 <b>Oriental Universiteti</b>\n\n"
             f"👋 Assalomu alaykum, {full_name}!\n"
             f"📚 Fakultetingizni tanlang:",
-            reply_markup=faculty_menu,
+            reply_markup=await get_faculty_menu(),
             parse_mode="HTML"
         )
         return
 
-    # Obuna tekshirish
-    if await check_all_subscriptions(user_id):
+    # Obuna tekshirish - bitta o'tish
+    unsubscribed = await get_unsubscribed_channels(user_id)
+    if not unsubscribed:
         await message.answer(
             f"✅ <b>Obuna tasdiqlandi!</b>\n\n"
             f"👋 Xush kelibsiz, {full_name}!\n"
             f"📚 Fakultetingizni tanlang:",
-            reply_markup=faculty_menu,
+            reply_markup=await get_faculty_menu(),
             parse_mode="HTML"
         )
     else:
         # Obuna yo'q
-        unsubscribed = await get_unsubscribed_channels(user_id)
         keyboard = build_subscription_keyboard(unsubscribed)
 
         msg = await message.answer(
@@ -203,7 +171,7 @@ async def start_handler(message: types.Message):
         )
 
         # Avtomatik tekshiruv
-        asyncio.create_task(auto_check_subscription(user_id, msg))
+        auto_check_subscription(user_id, msg)
 
 
 # ==================== OBUNA CALLBACK ====================
@@ -215,8 +183,11 @@ async def check_subscription_callback(call: types.CallbackQuery):
 
     await call.answer("🔄 Tekshirish...")
 
+    # Qo'lda tekshirildi - avtomatik kuzatuv endi kerak emas
+    subscription_watcher.cancel(user_id)
+
     # Admin
-    if user_id in ADMINS or user_db.check_if_admin(user_id):
+    if user_db.is_admin(user_id):
         await call.message.edit_text("👑 Siz adminsiz!")
         await call.message.answer("Admin panel:", reply_markup=admin_menu)
         return
@@ -229,18 +200,18 @@ async def check_subscription_callback(call: types.CallbackQuery):
         call.from_user.last_name
     )
 
-    # Obuna tekshirish
-    if await check_all_subscriptions(user_id):
+    # Obuna tekshirish - tugma bosilganda keshdagi salbiy natijalar qayta tekshiriladi
+    unsubscribed = await get_unsubscribed_channels(user_id, fresh=True)
+    if not unsubscribed:
         await call.message.edit_text(
             f"🎉 <b>Zo'r!</b>\n\n"
             f"✅ Obuna tasdiqlandi!\n"
             f"👋 Xush kelibsiz, {full_name}!\n"
             f"📚 Fakultetingizni tanlang:",
-            reply_markup=faculty_menu,
+            reply_markup=await get_faculty_menu(),
             parse_mode="HTML"
         )
     else:
-        unsubscribed = await get_unsubscribed_channels(user_id)
         keyboard = build_subscription_keyboard(unsubscribed)
 
         await call.message.edit_text(
@@ -6,7 +6,10 @@ Fakultet tanlash - Inline keyboard
 """
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-# Fakultet mapping
+from loader import dars_db
+from utils.misc.cache import VersionedCache
+
+# Eski callback lar (avval yuborilgan xabarlardagi tugmalar uchun)
 FACULTY_MAPPING = {
     "faculty_dasturiy": "Dasturiy injiniring",
     "faculty_kompyuter": "Kompyuter injiniring",
@@ -24,7 +27,7 @@ FACULTY_MAPPING = {
     "faculty_pedagogika": "Pedagogika"
 }
 
-# Fakultet menu
+# Fakultet menu - zaxira (jadval bo'sh bo'lsa)
 faculty_menu = InlineKeyboardMarkup(row_width=2)
 faculty_menu.add(
     InlineKeyboardButton("💻 Dasturiy injiniring", callback_data="faculty_dasturiy"),
@@ -42,3 +45,35 @@ faculty_menu.add(
     InlineKeyboardButton("📚 Talim nazariyasi", callback_data="faculty_talim"),
     InlineKeyboardButton("🎓 Pedagogika", callback_data="faculty_pedagogika")
 )
+
+# Tugma belgilari - fakultet nomi bo'yicha
+FACULTY_ICONS = {
+    FACULTY_MAPPING[button.callback_data]: button.text.split(" ", 1)[0]
+    for row in faculty_menu.inline_keyboard for button in row
+}
+DEFAULT_ICON = "🎓"
+
+_menu_cache = VersionedCache(dars_db.catalog, maxsize=1)
+
+
+def build_faculty_menu(fakultetlar):
+    """Fakultet jadvalidan menyu: [(id, name), ...] -> faculty_<id>"""
+    markup = InlineKeyboardMarkup(row_width=2)
+    markup.add(*(
+        InlineKeyboardButton(f"{FACULTY_ICONS.get(name, DEFAULT_ICON)} {name}", callback_data=f"faculty_{fak_id}")
+        for fak_id, name in fakultetlar
+    ))
+    return markup
+
+
+async def get_faculty_menu():
+    """Fakultet menyusi (katalog versiyasi bo'yicha keshlangan)"""
+    markup = _menu_cache.get('faculty_menu')
+    if markup is None:
+        version = _menu_cache.version
+        fakultetlar = await dars_db.catalog.fakultetlar_async()
+        if not fakultetlar:
+            return faculty_menu
+        markup = build_faculty_menu(fakultetlar)
+        _menu_cache.set('faculty_menu', markup, version)
+    return markup
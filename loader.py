@@ -1,30 +1,47 @@
 # loader.py
 
 from aiogram import Bot, Dispatcher
-from aiogram.contrib.fsm_storage.memory import MemoryStorage
-from data.config import BOT_TOKEN
+from data.config import BOT_TOKEN, ADMINS
 from utils.db_api.user import UserDatabase
 from utils.db_api.courses import CourseDatabase
 from utils.db_api.channel import ChannelDB
+from utils.db_api.broadcasts import BroadcastDB
+from utils.db_api.counters import CounterBuffer
+from utils.db_api.activity import ActivityTracker
+from utils.db_api.blocked import BlockedUsersBuffer
+from utils.db_api.fsm_storage import SQLiteStorage
+from utils.subscription import SubscriptionService, SubscriptionWatcher
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
-# Bot va Dispatcher
-bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
-storage = MemoryStorage()
-dp = Dispatcher(bot, storage=storage)
-
 # Database path - /tmp papkasida (har doim yozish mumkin)
 DB_PATH = "main.db"
 
 # Yoki URI mode ishlatish
 # DB_PATH = "file:main.db?mode=memory&cache=shared"
 
-# Databaselar
-user_db = UserDatabase(DB_PATH)
+# Bot va Dispatcher - FSM holatlari qayta ishga tushishda saqlanib qoladi
+bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
+storage = SQLiteStorage(DB_PATH)
+dp = Dispatcher(bot, storage=storage)
+
+# Databaselar - barchasi bitta ulanishlar havzasidan foydalanadi
+user_db = UserDatabase(DB_PATH, admins=ADMINS)
 dars_db = CourseDatabase(DB_PATH)
 channel_db = ChannelDB(DB_PATH)
+broadcast_db = BroadcastDB(DB_PATH)
+
+# Faollik va yuklanish hisoblagichlari (write-behind)
+activity_tracker = ActivityTracker(user_db)
+counter_buffer = CounterBuffer(dars_db, activity=activity_tracker)
+# Bloklangan foydalanuvchilar (reklama xatolari va my_chat_member dan)
+blocked_users = BlockedUsersBuffer(user_db)
+
+# Majburiy obuna tekshiruvi - middleware, /start va kanal bo'limi uchun umumiy
+subscription_service = SubscriptionService(bot, channel_db)
+# Obunani kutayotganlarni davriy tekshirish (bitta rejalashtiruvchi)
+subscription_watcher = SubscriptionWatcher(subscription_service)
 
 logger.info("✅ Bot komponentlari yuklandi")
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+DB benchmark - so'rov kechikishi: har so'rovda yangi ulanish (eski) va ulanishlar havzasi
+
+Ishga tushirish (loyiha ildizidan):
+    python -m scripts.bench_db
+    python -m scripts.bench_db --users 2000 --iterations 2000
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+from utils.db_api.courses import CourseDatabase
+from utils.db_api.user import UserDatabase
+
+
+class PerCallPool:
+    """Eski xatti-harakat: har so'rovda sqlite3.connect, PRAGMA larsiz, keyin yopish"""
+
+    def __init__(self, path_to_db):
+        self.path_to_db = path_to_db
+
+    def acquire(self):
+        conn = sqlite3.connect(self.path_to_db)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        conn.close()
+
+    def close(self):
+        pass
+
+
+def setup(path, users, pooled):
+    """Sinov bazasi: `users` ta foydalanuvchi, bitta fakultet va dars"""
+    user_db = UserDatabase(path)
+    dars_db = CourseDatabase(path)
+    if not pooled:
+        user_db.pool = dars_db.pool = PerCallPool(path)
+
+    user_db.create_table()
+    dars_db.create_tables()
+    with user_db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO Users(telegram_id, first_name) VALUES (?, ?)",
+            [(1000 + i, f"user{i}") for i in range(users)]
+        )
+    dars_db.add_fakultet("Bench")
+    dars_db.add_dars(1, "B1", "Bench dars", "file_id", mavzu_name="Bench")
+    return user_db, dars_db
+
+
+def measure(func, iterations, arg):
+    """Bitta so'rovning o'rtacha vaqti (mikrosekund)"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(arg(i))
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(pooled, users, iterations):
+    with tempfile.TemporaryDirectory() as tmp:
+        user_db, dars_db = setup(os.path.join(tmp, "bench.db"), users, pooled)
+        results = {
+            'select_user': measure(user_db.select_user, iterations, lambda i: 1000 + i % users),
+            'search_dars_by_code': measure(dars_db.search_dars_by_code, iterations, lambda i: "B1"),
+            'update_last_active': measure(user_db.update_last_active, iterations, lambda i: 1000 + i % users),
+            'update_download_count': measure(dars_db.update_download_count, iterations, lambda i: "B1"),
+        }
+        user_db.close()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So'rov kechikishi: havzasiz va havza bilan")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    before = run(False, args.users, args.iterations)
+    after = run(True, args.users, args.iterations)
+
+    print(f"{args.users} ta foydalanuvchi, {args.iterations} ta takror\n")
+    print(f"  {'query':<22} {'before':>10} {'after':>10}")
+    for name in before:
+        print(f"  {name:<22} {before[name]:>7.1f} us {after[name]:>7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
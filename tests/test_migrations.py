@@ -0,0 +1,174 @@
+"""
+Migratsiyalar - sxema versiyasi, epoch backfill va indekslardan foydalanish
+"""
+import sqlite3
+
+import pytest
+
+from utils.db_api.courses import CourseDatabase
+from utils.db_api.migrations import MIGRATIONS, apply_migrations, get_version
+from utils.db_api.user import UserDatabase
+
+LATEST = MIGRATIONS[-1][0]
+
+# Asl (epoch dan oldingi) sxema - vaqtlar ISO satr sifatida
+LEGACY_SCHEMA = """
+CREATE TABLE Users(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    telegram_id BIGINT NOT NULL UNIQUE,
+    username VARCHAR(255),
+    first_name VARCHAR(255),
+    last_name VARCHAR(255),
+    faculty VARCHAR(255),
+    is_blocked BOOLEAN DEFAULT 0,
+    is_admin BOOLEAN DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_active DATETIME,
+    total_downloads INTEGER DEFAULT 0
+);
+CREATE TABLE Fakultet (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Mavzu (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fakultet_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(fakultet_id, name)
+);
+CREATE TABLE Lesson (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fakultet_id INTEGER NOT NULL,
+    mavzu_id INTEGER,
+    code TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    file_id VARCHAR(2000) NOT NULL,
+    file_name TEXT,
+    file_size INTEGER DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    count_download INTEGER DEFAULT 0
+);
+INSERT INTO Users(telegram_id, faculty, created_at, last_active)
+VALUES (1, 'Tarix', '2024-01-02 03:04:05', '2024-01-03 10:00:00'),
+       (2, NULL, '2024-02-01 00:00:00', NULL);
+INSERT INTO Fakultet(name) VALUES ('Tarix');
+INSERT INTO Mavzu(fakultet_id, name) VALUES (1, 'Mavzu');
+INSERT INTO Lesson(fakultet_id, mavzu_id, code, title, file_id, created_at)
+VALUES (1, 1, 'A1', 'Dars 10', 'f1', '2024-03-01 12:00:00'),
+       (1, 1, 'A2', 'Dars 2', 'f2', '2024-03-02 12:00:00');
+"""
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    """Bo'sh bazadan (user_version=0) oxirgi versiyagacha"""
+    path = str(tmp_path / "fresh.db")
+    users = UserDatabase(path)
+    courses = CourseDatabase(path)
+    users.create_table()
+    courses.create_tables()
+    apply_migrations(courses)
+    yield users, courses
+    courses.close()
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """Eski sxemadagi (ISO vaqtli) baza"""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+
+    courses = CourseDatabase(path)
+    yield courses
+    courses.close()
+
+
+def query_plan(db, method, *args):
+    """Metod bajargan oxirgi SQL uchun EXPLAIN QUERY PLAN"""
+    original = db.execute
+    captured = []
+
+    def spy(sql, parameters=None, **kwargs):
+        captured.append((sql, parameters or ()))
+        return original(sql, parameters, **kwargs)
+
+    db.execute = spy
+    try:
+        method(*args)
+    finally:
+        del db.execute
+
+    sql, parameters = captured[-1]
+    rows = db.execute(f"EXPLAIN QUERY PLAN {sql}", parameters, fetchall=True)
+    return " | ".join(row['detail'] for row in rows)
+
+
+# ==================== VERSIYA ====================
+def test_fresh_database_reaches_latest_version(fresh_db):
+    _, courses = fresh_db
+    assert get_version(courses) == LATEST
+    # Qayta ishga tushirish - hech narsa qo'llanmaydi
+    assert apply_migrations(courses) == 0
+
+
+def test_legacy_database_reaches_latest_version(legacy_db):
+    assert get_version(legacy_db) == 0
+    assert apply_migrations(legacy_db) == len(MIGRATIONS)
+    assert get_version(legacy_db) == LATEST
+
+
+# ==================== EPOCH BACKFILL ====================
+def test_epoch_backfill_produces_integers(legacy_db):
+    apply_migrations(legacy_db)
+
+    rows = legacy_db.execute(
+        "SELECT telegram_id, typeof(created_at) AS c, typeof(last_active) AS a, "
+        "created_at, last_active FROM Users ORDER BY telegram_id",
+        fetchall=True
+    )
+    assert [(row['c'], row['a']) for row in rows] == [('integer', 'integer'), ('integer', 'null')]
+    assert rows[0]['created_at'] == 1704164645  # 2024-01-02 03:04:05 UTC
+    assert rows[0]['last_active'] == 1704276000  # 2024-01-03 10:00:00 UTC
+
+    types = legacy_db.execute("SELECT DISTINCT typeof(created_at) FROM Lesson", fetchall=True)
+    assert [row[0] for row in types] == ['integer']
+
+
+def test_legacy_lessons_get_sort_key(legacy_db):
+    apply_migrations(legacy_db)
+    titles = [row['title'] for row in legacy_db.get_dars_by_mavzu(1, 'Mavzu')]
+    assert titles == ['Dars 2', 'Dars 10']
+
+
+# ==================== INDEKSLAR ====================
+@pytest.mark.parametrize("method, args, index", [
+    ('count_daily_users', (), 'idx_users_created_at'),
+    ('count_weekly_users', (), 'idx_users_created_at'),
+    ('count_monthly_users', (), 'idx_users_created_at'),
+    ('count_active_daily_users', (), 'idx_users_last_active'),
+    ('count_active_weekly_users', (), 'idx_users_last_active'),
+    ('count_active_monthly_users', (), 'idx_users_last_active'),
+    ('count_users_by_faculty', ('Tarix',), 'idx_users_faculty'),
+    ('get_faculty_distribution', (), 'idx_users_faculty'),
+    ('get_all_admins', (), 'idx_users_is_admin'),
+    ('get_user_ids_after', (0, 200, ("is_blocked=0 AND id <= ?", (10,))), 'idx_users_reachable'),
+])
+def test_user_queries_use_indexes(fresh_db, method, args, index):
+    users, _ = fresh_db
+    plan = query_plan(users, getattr(users, method), *args)
+    assert index in plan, plan
+
+
+@pytest.mark.parametrize("method, args, index", [
+    ('get_dars_by_fakultet', (1,), 'idx_lesson_sort'),
+    ('count_dars_by_fakultet', (1,), 'idx_lesson_sort'),
+    ('get_top_downloaded_darslar', (10,), 'idx_lesson_count_download'),
+])
+def test_lesson_queries_use_indexes(fresh_db, method, args, index):
+    _, courses = fresh_db
+    plan = query_plan(courses, getattr(courses, method), *args)
+    assert index in plan, plan
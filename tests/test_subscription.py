@@ -0,0 +1,98 @@
+"""
+Obuna xizmati - parallel tekshiruvlarni birlashtirish (single-flight)
+"""
+import asyncio
+
+from utils.subscription import SubscriptionService
+
+CHANNEL = -100
+
+
+class FakeChannelDB:
+    """Kanallar ro'yxati `gate` ochilguncha kutadi"""
+
+    def __init__(self, member_status=None):
+        self.gate = asyncio.Event()
+        self.loads = 0
+        self.member_status = member_status  # channel_members dagi yozuv
+        self.writes = []
+
+    async def get_all_channels_async(self):
+        self.loads += 1
+        await self.gate.wait()
+        return [(CHANNEL, "Kanal", "https://t.me/k")]
+
+    async def get_member_status_async(self, channel_id, user_id, max_age=None):
+        return self.member_status
+
+    async def set_member_status_async(self, channel_id, user_id, subscribed):
+        self.member_status = subscribed
+        self.writes.append(subscribed)
+
+
+class FakeBot:
+    def __init__(self, status):
+        self.status = status
+        self.calls = 0
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        return type("Member", (), {'status': self.status})()
+
+
+def make_service(status="member"):
+    channel_db = FakeChannelDB()
+    service = SubscriptionService(FakeBot(status), channel_db)
+    # Salbiy natija keshda - oddiy tekshiruv API ga bormaydi
+    service._remember(1, CHANNEL, False)
+    return service, channel_db
+
+
+def test_fresh_check_does_not_join_cached_check():
+    async def scenario():
+        service, channel_db = make_service()
+        cached = asyncio.ensure_future(service.is_subscribed(1))
+        await asyncio.sleep(0)
+        fresh = asyncio.ensure_future(service.is_subscribed(1, fresh=True))
+        await asyncio.sleep(0)
+        channel_db.gate.set()
+        await cached
+        return await fresh, service
+
+    fresh, service = asyncio.run(scenario())
+    assert fresh is True
+    assert service.bot.calls == 1
+    assert service.shared_checks == 0
+
+
+def test_cached_check_joins_fresh_check():
+    async def scenario():
+        service, channel_db = make_service()
+        fresh = asyncio.ensure_future(service.is_subscribed(1, fresh=True))
+        await asyncio.sleep(0)
+        cached = asyncio.ensure_future(service.is_subscribed(1))
+        await asyncio.sleep(0)
+        channel_db.gate.set()
+        return await fresh, await cached, service
+
+    fresh, cached, service = asyncio.run(scenario())
+    assert fresh is True and cached is True
+    assert service.channel_db.loads == 1
+    assert service.shared_checks == 1
+    assert service._inflight == {}
+
+
+def test_fresh_check_ignores_negative_table_row():
+    async def scenario():
+        channel_db = FakeChannelDB(member_status=False)
+        channel_db.gate.set()
+        service = SubscriptionService(FakeBot("member"), channel_db)
+        # Oddiy tekshiruv jadvalga ishonadi
+        cached = await service.is_subscribed(1)
+        return cached, await service.is_subscribed(1, fresh=True), service
+
+    cached, fresh, service = asyncio.run(scenario())
+    assert cached is False
+    assert fresh is True
+    assert service.bot.calls == 1
+    assert service.channel_db.writes == [True]
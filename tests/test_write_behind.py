@@ -0,0 +1,59 @@
+"""
+Write-behind buferlar - bo'laklab yozish va stop() dagi oxirgi yozish
+"""
+import asyncio
+
+import pytest
+
+from utils.db_api.activity import ActivityTracker
+from utils.db_api.blocked import BlockedUsersBuffer
+from utils.db_api.user import UserDatabase
+
+
+@pytest.fixture
+def user_db(tmp_path):
+    db = UserDatabase(str(tmp_path / "users.db"))
+    db.create_table()
+    for telegram_id in range(1, 6):
+        db.add_user(telegram_id)
+    yield db
+    db.close()
+
+
+def column(db, name):
+    rows = db.execute(f"SELECT telegram_id, {name} FROM Users ORDER BY telegram_id", fetchall=True)
+    return {row[0]: row[1] for row in rows}
+
+
+def test_blocked_buffer_writes_in_chunks(user_db):
+    buffer = BlockedUsersBuffer(user_db)
+    buffer.CHUNK_SIZE = 2
+    for telegram_id in (1, 2, 3, 4):
+        buffer.mark_blocked(telegram_id)
+    buffer.mark_unblocked(4)
+
+    assert buffer.flush() == 4
+    assert column(user_db, 'is_blocked') == {1: 1, 2: 1, 3: 1, 4: 0, 5: 0}
+
+
+def test_stop_flushes_pending(user_db):
+    async def scenario():
+        tracker = ActivityTracker(user_db, flush_interval=3600)
+        tracker.start()
+        tracker.touch(5)
+        await tracker.stop()
+        return tracker
+
+    tracker = asyncio.run(scenario())
+    assert tracker._task is None
+    assert column(user_db, 'last_active')[5] is not None
+
+
+def test_failed_flush_keeps_pending(user_db):
+    buffer = BlockedUsersBuffer(user_db)
+    buffer.mark_blocked(1)
+    user_db.execute("DROP TABLE Users", commit=True)
+
+    with pytest.raises(Exception):
+        buffer.flush()
+    assert buffer._pending == {1: 1}
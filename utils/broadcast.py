@@ -0,0 +1,286 @@
+"""
+Broadcast - ko'p foydalanuvchiga xabarni tezlik chegarasi ostida yuborish
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+
+from aiogram.utils.exceptions import BotBlocked, ChatNotFound, RetryAfter, Unauthorized
+
+from utils.misc.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Qayta urinishdan foyda yo'q - chat yopiq yoki mavjud emas
+DEAD_CHAT_ERRORS = (BotBlocked, ChatNotFound, Unauthorized)
+
+
+class TokenBucket:
+    """Global tezlik chegarasi: soniyasiga `rate` ta, `capacity` gacha yig'iladi
+
+    `pause()` - flood kutish oynasi tugaguncha hech kimga token berilmaydi.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = 0.0  # Boshida portlash yo'q
+        self._updated = None
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Bitta token (kerak bo'lsa kutadi)"""
+        loop = asyncio.get_running_loop()
+        # Lock - kutuvchilar navbat bilan, tokenlar tekis taqsimlanadi
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def is_paused(self):
+        return asyncio.get_running_loop().time() < self._paused_until
+
+    def pause(self, seconds):
+        """Flood oynasi - `seconds` davomida yuborish to'xtaydi"""
+        now = asyncio.get_running_loop().time()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+
+class Broadcaster:
+    """Worker pool + token bucket
+
+    Workerlar umumiy navbatdan chat_id oladi, har bir yuborishdan oldin
+    global bucketdan token oladi va bitta chatga soniyasiga bittadan ortiq
+    yubormaydi. RetryAfter kelsa - hamma flood oynasi tugaguncha kutadi,
+    faol workerlar soni ikki barobar kamayadi (keyin asta-sekin tiklanadi),
+    qabul qiluvchi esa qayta urinishlar navbatiga tushadi va worker
+    keyingisiga o'tadi.
+    """
+
+    RATE = 28  # msg/s - Bot API chegarasi ~30
+    MAX_WORKERS = 20
+    MIN_WORKERS = 2
+    GROW_AFTER = 200  # Shuncha muvaffaqiyatli yuborishdan keyin +1 worker
+    PER_CHAT_INTERVAL = 1.0  # Bitta chatga yuborishlar orasida
+    BURST = 3  # Pauza/bo'sh turishdan keyin yig'iladigan tokenlar
+    MAX_ATTEMPTS = 3  # Bitta qabul qiluvchi uchun jami urinishlar
+
+    def __init__(self, send, rate=RATE, workers=MAX_WORKERS, on_dead=None):
+        self.send = send  # async send(chat_id)
+        self.on_dead = on_dead  # on_dead(chat_id) - bloklangan/yo'q chat
+        self.bucket = TokenBucket(rate, capacity=self.BURST)
+        self.max_workers = workers
+        self.concurrency = workers
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0  # Qayta yuborishga qo'yilganlar
+        self.flood_waits = 0
+
+        self.running = False
+        self.paused = False
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._recent = TTLCache(maxsize=10000, ttl=self.PER_CHAT_INTERVAL)  # {chat_id: yuborilgan vaqt}
+        self._streak = 0
+        self._active = 0  # Hozir yuborayotgan workerlar (<= concurrency)
+        self._slots = asyncio.Condition()
+        self._attempts = {}  # {chat_id: urinishlar} - faqat qayta urinilayotganlar
+        self._retries = []  # heap: (vaqt, tartib, chat_id)
+        self._retry_added = asyncio.Event()
+        self._seq = itertools.count()
+
+    # ==================== BOSHQARUV ====================
+    def pause(self):
+        self.paused = True
+        self._resumed.clear()
+
+    def resume(self):
+        self.paused = False
+        self._resumed.set()
+
+    def stop(self):
+        self.running = False
+        self._resumed.set()  # Pauzadagi workerlar chiqib ketishi uchun
+
+    # ==================== YUBORISH ====================
+    async def run(self, batches, on_batch=None):
+        """Partiyalab yuborish, hammasi tugaguncha yoki stop() gacha
+
+        batches - (kursor, [chat_id, ...]) async iterator. Partiya to'liq
+        yuborilgach `await on_batch(kursor)` chaqiriladi (checkpoint uchun).
+        """
+        self.running = True
+        queue = asyncio.Queue(maxsize=self.max_workers * 4)
+        workers = [asyncio.ensure_future(self._worker(queue)) for _ in range(self.max_workers)]
+        retrier = asyncio.ensure_future(self._retry_loop(queue))
+
+        try:
+            async for cursor, chat_ids in batches:
+                for chat_id in chat_ids:
+                    if not self.running:
+                        break
+                    await queue.put(chat_id)
+                await queue.join()
+                # To'xtatilgan partiya yarim qolgan - kursor siljimaydi
+                if not self.running:
+                    break
+                if on_batch:
+                    await on_batch(cursor)
+        finally:
+            retrier.cancel()
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._retries.clear()
+            self._attempts.clear()
+            self.running = False
+
+    async def _worker(self, queue):
+        while True:
+            chat_id = await queue.get()
+            if chat_id is None:
+                return
+            retry = False
+            try:
+                await self._resumed.wait()
+                if self.running:
+                    retry = await self._deliver_in_slot(chat_id)
+            finally:
+                # Qayta urinishdagi yozuv navbatga qaytguncha "tugamagan" hisoblanadi
+                if not retry:
+                    queue.task_done()
+
+    async def _deliver_in_slot(self, chat_id):
+        # Faol workerlar soni concurrency dan oshmaydi
+        async with self._slots:
+            await self._slots.wait_for(lambda: self._active < self.concurrency)
+            self._active += 1
+        try:
+            return await self._deliver(chat_id)
+        finally:
+            async with self._slots:
+                self._active -= 1
+                self._slots.notify_all()
+
+    async def _deliver(self, chat_id):
+        """Bitta yuborish; qayta urinishga qo'yilsa True"""
+        loop = asyncio.get_running_loop()
+        # Bitta chatga tez-tez yubormaslik
+        last = self._recent.get(chat_id)
+        if last is not None:
+            await asyncio.sleep(max(0.0, last + self.PER_CHAT_INTERVAL - loop.time()))
+
+        # Token kutilayotganda pause()/stop() bo'lishi mumkin - yuborishdan oldin qayta tekshiriladi
+        while True:
+            await self._resumed.wait()
+            if not self.running:
+                return False
+            await self.bucket.acquire()
+            if not self.running:
+                return False
+            if not self.paused:
+                break
+
+        try:
+            self._recent.set(chat_id, loop.time())
+            await self.send(chat_id)
+            self.sent += 1
+            self._on_success()
+        except RetryAfter as e:
+            self._on_flood(e.timeout)
+            return self._schedule_retry(chat_id, e.timeout)
+        except DEAD_CHAT_ERRORS:
+            self.failed += 1
+            if self.on_dead:
+                self.on_dead(chat_id)
+        except Exception as e:
+            logger.warning(f"Broadcast xatolik {chat_id}: {e}")
+            self.failed += 1
+        self._attempts.pop(chat_id, None)
+        return False
+
+    # ==================== QAYTA URINISH ====================
+    def _schedule_retry(self, chat_id, delay):
+        attempts = self._attempts.get(chat_id, 1)
+        if attempts >= self.MAX_ATTEMPTS:
+            self._attempts.pop(chat_id, None)
+            self.failed += 1
+            return False
+
+        self._attempts[chat_id] = attempts + 1
+        due = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._retries, (due, next(self._seq), chat_id))
+        self._retry_added.set()
+        self.retried += 1
+        return True
+
+    async def _retry_loop(self, queue):
+        """Vaqti kelgan qayta urinishlarni asosiy navbatga qaytarish"""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._retries:
+                self._retry_added.clear()
+                await self._retry_added.wait()
+                continue
+
+            due = self._retries[0][0]
+            if due > loop.time():
+                # Yangi, ertaroq yozuv qo'shilsa uyg'onish
+                self._retry_added.clear()
+                try:
+                    await asyncio.wait_for(self._retry_added.wait(), due - loop.time())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, chat_id = heapq.heappop(self._retries)
+            if self.running:
+                await queue.put(chat_id)
+            # Asl yozuv endi tugadi (yangi nusxasi navbatda)
+            queue.task_done()
+
+    def _on_success(self):
+        self._streak += 1
+        if self._streak >= self.GROW_AFTER and self.concurrency < self.max_workers:
+            self.concurrency += 1
+            self._streak = 0
+
+    def _on_flood(self, timeout):
+        self.flood_waits += 1
+        self._streak = 0
+        # Bitta flood oynasida bir necha worker xato olsa - bir marta kamaytiriladi
+        if not self.bucket.is_paused():
+            self.concurrency = max(self.MIN_WORKERS, self.concurrency // 2)
+        self.bucket.pause(timeout)
+        logger.warning(f"⏳ Flood: {timeout}s kutish, workerlar: {self.concurrency}")
+
+    def get_stats(self) -> dict:
+        """Yuborish statistikasi"""
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'retry_queue': len(self._retries),
+            'flood_waits': self.flood_waits,
+            'concurrency': self.concurrency,
+            'rate': self.bucket.rate,
+            'paused': self.paused,
+            'running': self.running
+        }
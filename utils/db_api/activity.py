@@ -0,0 +1,77 @@
+"""
+Faollik kuzatuvchisi - last_active ni kamroq yozish
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+from .write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker(WriteBehindBuffer):
+    """Debounce qilingan last_active
+
+    Har bir foydalanuvchi uchun last_active `window` soniyada ko'pi bilan
+    bir marta yoziladi. Kun almashganda birinchi faollik darhol yoziladi,
+    shuning uchun DAU/WAU/MAU `window` aniqligida to'g'ri qoladi.
+    """
+
+    def __init__(self, db, window=300, flush_interval=30):
+        super().__init__(db, flush_interval)
+        self.window = window
+        self.tz = pytz.timezone("Asia/Tashkent")
+
+        self._dirty = set()
+        self._last_written = {}  # {telegram_id: epoch}
+        self._lock = threading.Lock()
+
+    def _start_of_day(self):
+        """Bugun boshlanishi (epoch)"""
+        now = datetime.now(self.tz)
+        return now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+    def touch(self, telegram_id):
+        """Faollikni qayd qilish (DB ga so'rov yo'q)"""
+        now = time.time()
+        with self._lock:
+            last = self._last_written.get(telegram_id)
+            if last is not None and now - last < self.window and last >= self._start_of_day():
+                return
+            self._dirty.add(telegram_id)
+
+    def flush(self):
+        """Yig'ilgan foydalanuvchilarni bitta UPDATE bilan yozish"""
+        with self._lock:
+            dirty = list(self._dirty)
+            self._dirty.clear()
+
+        if not dirty:
+            return 0
+
+        now = time.time()
+        stamp = int(now)
+        try:
+            with self.db.get_connection() as conn:
+                self._update_in_chunks(
+                    conn, "UPDATE Users SET last_active=? WHERE telegram_id IN ({})", stamp, dirty
+                )
+        except Exception as e:
+            logger.error(f"Faollikni yozish xatosi: {e}")
+            with self._lock:
+                self._dirty.update(dirty)
+            raise
+
+        with self._lock:
+            for tid in dirty:
+                self._last_written[tid] = now
+            # Oyna tugagan yozuvlar baribir qayta yoziladi - xotirani tozalash
+            expired = [tid for tid, ts in self._last_written.items() if now - ts >= self.window]
+            for tid in expired:
+                del self._last_written[tid]
+
+        return len(dirty)
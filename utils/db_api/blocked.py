@@ -0,0 +1,67 @@
+"""
+Bloklangan foydalanuvchilar - is_blocked ni partiyalab yozish
+"""
+import logging
+import threading
+
+from .write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class BlockedUsersBuffer(WriteBehindBuffer):
+    """Yetkazib bo'lmagan chatlarni yig'ib, is_blocked ni bitta tranzaksiyada yozish
+
+    Manbalar: reklama paytidagi BotBlocked/UserDeactivated/ChatNotFound va
+    my_chat_member ("kicked" - bloklandi, "member" - qayta ochildi).
+    Bir foydalanuvchi uchun oxirgi holat yoziladi.
+    """
+
+    def __init__(self, db, flush_interval=10):
+        super().__init__(db, flush_interval)
+
+        self._pending = {}  # {telegram_id: 1/0}
+        self._lock = threading.Lock()
+
+        self.blocked = 0
+        self.unblocked = 0
+
+    def mark_blocked(self, telegram_id):
+        """Bot bloklangan yoki chat yo'q"""
+        with self._lock:
+            self._pending[telegram_id] = 1
+
+    def mark_unblocked(self, telegram_id):
+        """Foydalanuvchi botni qayta ochdi"""
+        with self._lock:
+            self._pending[telegram_id] = 0
+
+    def flush(self):
+        """Yig'ilganlarni yozish"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        groups = {1: [], 0: []}
+        for tid, value in pending.items():
+            groups[value].append(tid)
+
+        try:
+            with self.db.get_connection() as conn:
+                for value, ids in groups.items():
+                    self._update_in_chunks(
+                        conn, "UPDATE Users SET is_blocked=? WHERE telegram_id IN ({})", value, ids
+                    )
+        except Exception as e:
+            logger.error(f"is_blocked yozish xatosi: {e}")
+            with self._lock:
+                # Yangi kelganlari ustun
+                self._pending = {**pending, **self._pending}
+            raise
+
+        self.blocked += len(groups[1])
+        self.unblocked += len(groups[0])
+        logger.info(f"🚫 Bloklanganlar yozildi: +{len(groups[1])}, qaytganlar: {len(groups[0])}")
+        return len(pending)
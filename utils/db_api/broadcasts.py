@@ -0,0 +1,93 @@
+"""
+Reklama yuborish vazifalari - qayta ishga tushganda davom ettirish uchun
+"""
+import logging
+import time
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastDB(Database):
+    def __init__(self, path_to_db):
+        super().__init__(path_to_db)
+        self.create_table()
+
+    def create_table(self):
+        """broadcast_jobs jadvali"""
+        # max_user_id - auditoriya surati (yuborish boshlanganda olinadi, 0 - hali olinmagan):
+        # undan keyin qo'shilganlar kirmaydi
+        # cursor - oxirgi to'liq yuborilgan partiyadagi eng katta Users.id
+        self.execute('''
+            CREATE TABLE IF NOT EXISTS broadcast_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                creator_id INTEGER NOT NULL,
+                ad_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                send_time INTEGER,
+                status TEXT NOT NULL DEFAULT 'scheduled',
+                max_user_id INTEGER NOT NULL,
+                cursor INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                sent INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                retried INTEGER NOT NULL DEFAULT 0,
+                created_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+        ''', commit=True)
+        self.execute(
+            "CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_active ON broadcast_jobs(status) "
+            "WHERE status IN ('scheduled', 'running', 'paused')",
+            commit=True
+        )
+
+    def create_job(self, creator_id, ad_type, payload, send_time):
+        """Yangi vazifa (id qaytariladi)"""
+        now = int(time.time())
+        job_id = self.execute(
+            """
+            INSERT INTO broadcast_jobs(creator_id, ad_type, payload, send_time,
+                                       max_user_id, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 0, ?, ?)
+            """,
+            (creator_id, ad_type, payload, send_time, now, now),
+            commit=True
+        )
+        logger.info(f"📣 Reklama vazifasi #{job_id} yaratildi")
+        return job_id
+
+    def set_audience(self, job_id, max_user_id, total):
+        """Auditoriya surati - yuborish boshlanganda bir marta"""
+        self.execute(
+            "UPDATE broadcast_jobs SET max_user_id=?, total=?, updated_at=? WHERE id=?",
+            (max_user_id, total, int(time.time()), job_id),
+            commit=True
+        )
+        logger.info(f"📣 Reklama #{job_id}: {total} ta foydalanuvchi")
+
+    def get_job(self, job_id):
+        """Vazifa"""
+        return self.execute("SELECT * FROM broadcast_jobs WHERE id=?", (job_id,), fetchone=True)
+
+    def get_active_jobs(self):
+        """Tugamagan vazifalar (ishga tushganda davom ettiriladi)"""
+        sql = "SELECT * FROM broadcast_jobs WHERE status IN ('scheduled', 'running', 'paused') ORDER BY id"
+        return self.execute(sql, fetchall=True)
+
+    def checkpoint(self, job_id, cursor, sent, failed, retried=0):
+        """Partiya tugagach: kursor va hisoblagichlar"""
+        self.execute(
+            "UPDATE broadcast_jobs SET cursor=?, sent=?, failed=?, retried=?, updated_at=? WHERE id=?",
+            (cursor, sent, failed, retried, int(time.time()), job_id),
+            commit=True
+        )
+
+    def set_status(self, job_id, status):
+        """Holatni o'zgartirish"""
+        self.execute(
+            "UPDATE broadcast_jobs SET status=?, updated_at=? WHERE id=?",
+            (status, int(time.time()), job_id),
+            commit=True
+        )
@@ -0,0 +1,225 @@
+"""
+Katalog keshi - Fakultet/Mavzu/Dars ro'yxatlari xotirada
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """Jarayon darajasidagi katalog keshi
+
+    Bir marta quriladi, CourseDatabase dagi yozish metodlari
+    (add_fakultet, add_dars, delete_dars, delete_fakultet) uni
+    bekor qiladi yoki qisman yangilaydi.
+    """
+
+    OTHER = "Boshqa"  # Mavzusiz darslar
+
+    def __init__(self, db):
+        self.db = db
+        # Tuzilma versiyasi: fakultet/mavzu/dars qo'shilsa yoki o'chsa oshadi
+        # (tayyor klaviaturalar kaliti). Yuklanish sonlari uni o'zgartirmaydi.
+        self.version = 0
+        # Har qanday o'zgarish (yuklanishlar ham) - eskirgan yuklashni aniqlash uchun
+        self._generation = 0
+        self._writing = 0  # Commit qilinib, hali keshga qo'shilmagan yuklanishlar bor
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.RLock()
+        self._fakultet_maps = None  # ({name: id}, {id: name})
+        self._fakultet_data = {}  # {fakultet_id: ([(mavzu, dars_soni)], {mavzu: [dars]})} - tabiiy tartibda
+        self._by_code = {}  # {code: dars} - yuklanishlarni yangilash uchun
+
+    # ==================== YUKLASH ====================
+    def _load_fakultetlar(self):
+        generation = self._generation
+        # id tartibida - default fakultetlar menyudagi tartibda qo'shilgan
+        rows = self.db.execute("SELECT id, name FROM Fakultet ORDER BY id", fetchall=True)
+        maps = (
+            {row['name']: row['id'] for row in rows},
+            {row['id']: row['name'] for row in rows}
+        )
+        with self._lock:
+            # Yuklash paytida o'zgarish bo'lgan bo'lsa - eskirgan, saqlanmaydi
+            if self._generation == generation and not self._writing:
+                self._fakultet_maps = maps
+        return maps
+
+    def _load_fakultet(self, fakultet_id):
+        generation = self._generation
+        sql = """
+        SELECT l.id, l.code, l.title, l.file_id, l.created_at, l.count_download,
+               m.name as mavzu_name
+        FROM Lesson l
+        LEFT JOIN Mavzu m ON l.mavzu_id = m.id
+        WHERE l.fakultet_id = ?
+        ORDER BY m.name, l.sort_key
+        """
+        rows = self.db.execute(sql, (fakultet_id,), fetchall=True)
+
+        groups = {}
+        for row in rows:
+            dars = dict(row)
+            groups.setdefault(dars['mavzu_name'] or self.OTHER, []).append(dars)
+
+        data = ([(mavzu, len(groups[mavzu])) for mavzu in sorted(groups)], groups)
+        with self._lock:
+            # Yuklanishlar yozilayotganda o'qilgan son keyin yana qo'shilishi mumkin
+            if self._generation != generation or self._writing:
+                return data
+            self._fakultet_data[fakultet_id] = data
+            for darslar in groups.values():
+                for dars in darslar:
+                    self._by_code[dars['code']] = dars
+        return data
+
+    def _maps(self):
+        maps = self._fakultet_maps
+        if maps is None:
+            self.misses += 1
+            return self._load_fakultetlar()
+        self.hits += 1
+        return maps
+
+    async def _maps_async(self):
+        maps = self._fakultet_maps
+        if maps is None:
+            self.misses += 1
+            return await self.db.run(self._load_fakultetlar)
+        self.hits += 1
+        return maps
+
+    def _data(self, fakultet_id):
+        data = self._fakultet_data.get(fakultet_id)
+        if data is None:
+            self.misses += 1
+            return self._load_fakultet(fakultet_id)
+        self.hits += 1
+        return data
+
+    async def _data_async(self, fakultet_id):
+        data = self._fakultet_data.get(fakultet_id)
+        if data is None:
+            self.misses += 1
+            return await self.db.run(self._load_fakultet, fakultet_id)
+        self.hits += 1
+        return data
+
+    @staticmethod
+    def _sorted_fakultetlar(maps):
+        return sorted(maps[1].items())
+
+    @staticmethod
+    def _flatten(groups):
+        return [dars for mavzu in sorted(groups) for dars in groups[mavzu]]
+
+    # ==================== O'QISH ====================
+    def fakultetlar(self):
+        """[(id, name), ...] nom bo'yicha"""
+        return self._sorted_fakultetlar(self._maps())
+
+    def fakultet_id(self, name):
+        """Nom -> id"""
+        return self._maps()[0].get(name)
+
+    def fakultet_name(self, fakultet_id):
+        """id -> nom"""
+        return self._maps()[1].get(fakultet_id)
+
+    def mavzular(self, fakultet_id):
+        """[(mavzu, dars_soni), ...]"""
+        return self._data(fakultet_id)[0]
+
+    def darslar(self, fakultet_id, mavzu_name):
+        """Mavzudagi darslar"""
+        return self._data(fakultet_id)[1].get(mavzu_name, [])
+
+    def all_darslar(self, fakultet_id):
+        """Fakultetdagi barcha darslar"""
+        return self._flatten(self._data(fakultet_id)[1])
+
+    # ==================== ASYNC ====================
+    # Kesh topilsa event loop da qaytadi, aks holda DB executor da yuklanadi
+
+    async def fakultetlar_async(self):
+        return self._sorted_fakultetlar(await self._maps_async())
+
+    async def fakultet_id_async(self, name):
+        return (await self._maps_async())[0].get(name)
+
+    async def fakultet_name_async(self, fakultet_id):
+        return (await self._maps_async())[1].get(fakultet_id)
+
+    async def mavzular_async(self, fakultet_id):
+        return (await self._data_async(fakultet_id))[0]
+
+    async def darslar_async(self, fakultet_id, mavzu_name):
+        return (await self._data_async(fakultet_id))[1].get(mavzu_name, [])
+
+    async def all_darslar_async(self, fakultet_id):
+        return self._flatten((await self._data_async(fakultet_id))[1])
+
+    # ==================== BEKOR QILISH ====================
+    def _bump(self):
+        self.version += 1
+        self._generation += 1
+
+    def invalidate_fakultetlar(self):
+        """Fakultet ro'yxati o'zgardi"""
+        with self._lock:
+            self._fakultet_maps = None
+            self._bump()
+
+    def invalidate_fakultet(self, fakultet_id):
+        """Bitta fakultetning mavzu/darslarini tashlash"""
+        with self._lock:
+            _, groups = self._fakultet_data.pop(fakultet_id, (None, {}))
+            for darslar in groups.values():
+                for dars in darslar:
+                    self._by_code.pop(dars['code'], None)
+            self._bump()
+
+    def begin_downloads(self):
+        """Yuklanishlar commit qilinadi - apply/cancel gacha yuklangan ma'lumot saqlanmaydi"""
+        with self._lock:
+            self._writing += 1
+            self._generation += 1
+
+    def cancel_downloads(self):
+        """Commit bo'lmadi"""
+        with self._lock:
+            self._writing -= 1
+            self._generation += 1
+
+    def apply_downloads(self, deltas):
+        """Commit qilingan yuklanishlarni keshdagi darslarga qo'shish (tuzilma versiyasi o'zgarmaydi)"""
+        with self._lock:
+            for code, n in deltas.items():
+                dars = self._by_code.get(code)
+                if dars:
+                    dars['count_download'] += n
+            self._writing -= 1
+            self._generation += 1
+
+    def clear(self):
+        """Butun keshni tozalash"""
+        with self._lock:
+            self._fakultet_maps = None
+            self._fakultet_data.clear()
+            self._by_code.clear()
+            self._bump()
+
+    def get_stats(self) -> dict:
+        """Kesh statistikasi"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'fakultetlar': len(self._fakultet_data),
+            'darslar': len(self._by_code),
+            'version': self.version
+        }
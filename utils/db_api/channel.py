@@ -1,14 +1,17 @@
-import sqlite3
 import os
 import logging
+import threading
+import time
+from .database import Database
 
 logger = logging.getLogger(__name__)
 
+# Obuna deb hisoblanadigan a'zolik holatlari
+SUBSCRIBED_STATUSES = ("member", "administrator", "creator")
 
-class ChannelDB:
-    def __init__(self, path_to_db):
-        self.path_to_db = path_to_db
 
+class ChannelDB(Database):
+    def __init__(self, path_to_db):
         # Database faylini avval yaratish
         db_dir = os.path.dirname(path_to_db)
         if db_dir and not os.path.exists(db_dir):
@@ -21,55 +24,102 @@ class ChannelDB:
             except Exception as e:
                 logger.error(f"Database yaratish xatosi: {e}")
 
-        self.conn = sqlite3.connect(path_to_db, check_same_thread=False)
-        self.cursor = self.conn.cursor()
+        super().__init__(path_to_db)
+        self.version = 0  # Kanallar to'plami o'zgarganda oshadi (obuna keshlari kaliti)
+        self._channels = None  # [(channel_id, title, invite_link)] - xotiradagi nusxa
+        self._channels_lock = threading.Lock()
         self.create_table()
 
-
     def create_table(self):
         """Kanallar jadvalini yaratish"""
-        self.cursor.execute('''
+        self.execute('''
             CREATE TABLE IF NOT EXISTS channels (
                 channel_id INTEGER PRIMARY KEY,
                 title TEXT NOT NULL,
                 invite_link TEXT NOT NULL DEFAULT ''
             )
-        ''')
-        self.conn.commit()
+        ''', commit=True)
+        # chat_member yangilanishlaridan yig'iladigan a'zolik holati
+        self.execute('''
+            CREATE TABLE IF NOT EXISTS channel_members (
+                channel_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                is_member INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY (channel_id, user_id)
+            ) WITHOUT ROWID
+        ''', commit=True)
         logger.info("✅ Channels table ready")
 
     def add_channel(self, channel_id, title, invite_link):
         """Kanal qo'shish"""
         try:
-            self.cursor.execute(
+            self.execute(
                 "INSERT OR REPLACE INTO channels VALUES (?, ?, ?)",
-                (channel_id, title, invite_link)
+                (channel_id, title, invite_link),
+                commit=True
             )
-            self.conn.commit()
+            self._invalidate()
             logger.info(f"➕ Kanal: {title}")
             return True
         except Exception as e:
             logger.error(f"Kanal qo'shish xatosi: {e}")
             return False
 
+    def _invalidate(self):
+        """Kanallar keshini tashlash"""
+        with self._channels_lock:
+            self._channels = None
+            self.version += 1
+
+    def _load_channels(self):
+        version = self.version
+        rows = self.execute(
+            "SELECT channel_id, title, invite_link FROM channels",
+            fetchall=True
+        )
+        channels = [tuple(row) for row in rows]
+        with self._channels_lock:
+            # Yuklash paytida o'zgarish bo'lgan bo'lsa - saqlanmaydi
+            if self.version == version:
+                self._channels = channels
+        return channels
+
     def get_all_channels(self):
-        """Barcha kanallar"""
-        self.cursor.execute("SELECT channel_id, title, invite_link FROM channels")
-        return self.cursor.fetchall()
+        """Barcha kanallar (xotiradan)"""
+        channels = self._channels
+        if channels is None:
+            channels = self._load_channels()
+        return list(channels)
+
+    async def get_all_channels_async(self):
+        """get_all_channels() - kesh bo'lsa event loop da, aks holda executor da"""
+        channels = self._channels
+        if channels is None:
+            channels = await self.run(self._load_channels)
+        return list(channels)
+
+    def get_channel_link(self, channel_id):
+        """Kanal havolasi"""
+        for cid, _, invite_link in self.get_all_channels():
+            if cid == channel_id:
+                return invite_link
+        return None
 
     def get_channel(self, channel_id):
         """Bitta kanal"""
-        self.cursor.execute(
+        return self.execute(
             "SELECT * FROM channels WHERE channel_id=?",
-            (channel_id,)
+            (channel_id,),
+            fetchone=True
         )
-        return self.cursor.fetchone()
 
     def delete_channel(self, channel_id):
         """Kanalni o'chirish"""
         try:
-            self.cursor.execute("DELETE FROM channels WHERE channel_id=?", (channel_id,))
-            self.conn.commit()
+            self.execute("DELETE FROM channels WHERE channel_id=?", (channel_id,), commit=True)
+            self.execute("DELETE FROM channel_members WHERE channel_id=?", (channel_id,), commit=True)
+            self._invalidate()
             logger.info(f"🗑 Kanal deleted: {channel_id}")
             return True
         except Exception as e:
@@ -78,15 +128,30 @@ class ChannelDB:
 
     def channel_exists(self, channel_id):
         """Kanal mavjudligini tekshirish"""
-        self.cursor.execute("SELECT 1 FROM channels WHERE channel_id=?", (channel_id,))
-        return bool(self.cursor.fetchone())
+        return any(cid == channel_id for cid, _, _ in self.get_all_channels())
 
     def count_channels(self):
         """Kanallar soni"""
-        self.cursor.execute("SELECT COUNT(*) FROM channels")
-        result = self.cursor.fetchone()
-        return result[0] if result else 0
+        return len(self.get_all_channels())
 
-    def close(self):
-        """Ulanishni yopish"""
-        self.conn.close()
\ No newline at end of file
+    # ==================== A'ZOLIK ====================
+    def set_member_status(self, channel_id, user_id, is_member):
+        """A'zolik holatini yozish"""
+        self.execute(
+            "INSERT OR REPLACE INTO channel_members VALUES (?, ?, ?, ?)",
+            (channel_id, user_id, int(bool(is_member)), int(time.time())),
+            commit=True
+        )
+
+    def get_member_status(self, channel_id, user_id, max_age=None):
+        """Saqlangan a'zolik holati (True/False) yoki noma'lum bo'lsa None"""
+        row = self.execute(
+            "SELECT is_member, updated_at FROM channel_members WHERE channel_id=? AND user_id=?",
+            (channel_id, user_id),
+            fetchone=True
+        )
+        if not row:
+            return None
+        if max_age is not None and time.time() - row['updated_at'] > max_age:
+            return None
+        return bool(row['is_member'])
@@ -0,0 +1,128 @@
+"""
+Hisoblagichlar buferi - yuklanishlar va faollikni birlashtirib yozish
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from .write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer(WriteBehindBuffer):
+    """Write-behind bufer
+
+    Yuklanishlar dars kodi va telegram_id bo'yicha xotirada yig'iladi va
+    har `flush_interval` soniyada yoki `flush_threshold` ta hodisadan keyin
+    bitta tranzaksiyada yoziladi.
+    """
+
+    def __init__(self, db, activity=None, flush_interval=10, flush_threshold=100):
+        super().__init__(db, flush_interval)
+        self.activity = activity  # ActivityTracker - last_active uchun
+        self.flush_threshold = flush_threshold
+
+        self._lesson_downloads = defaultdict(int)  # {code: +n}
+        self._user_downloads = defaultdict(int)  # {telegram_id: +n}
+        self._inflight_lessons = {}  # Yozilayotgan, hali commit bo'lmagan
+        self._events = 0
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_task = None
+
+    # ==================== YIG'ISH ====================
+    def add_download(self, code, telegram_id):
+        """Yuklanishni qayd qilish"""
+        with self._lock:
+            self._lesson_downloads[code] += 1
+            self._user_downloads[telegram_id] += 1
+            self._events += 1
+            full = self._events >= self.flush_threshold
+
+        if self.activity:
+            self.activity.touch(telegram_id)
+
+        if full:
+            self._schedule_flush()
+
+    def downloads(self, dars):
+        """Katalogdagi dars uchun jami: keshdagi son + yozilmaganlar (bir lock ostida)"""
+        with self._lock:
+            return (dars['count_download'] + self._lesson_downloads.get(dars['code'], 0)
+                    + self._inflight_lessons.get(dars['code'], 0))
+
+    # ==================== YOZISH ====================
+    def flush(self):
+        """Buferni bitta tranzaksiyada yozish"""
+        with self._flush_lock:
+            with self._lock:
+                lessons = dict(self._lesson_downloads)
+                users = dict(self._user_downloads)
+                self._lesson_downloads.clear()
+                self._user_downloads.clear()
+                self._inflight_lessons = lessons
+                self._events = 0
+
+            if not (lessons or users):
+                return 0
+
+            catalog = getattr(self.db, 'catalog', None)
+            if catalog:
+                catalog.begin_downloads()
+
+            try:
+                with self.db.get_connection() as conn:
+                    conn.executemany(
+                        "UPDATE Lesson SET count_download = count_download + ? WHERE code=?",
+                        [(n, code) for code, n in lessons.items()]
+                    )
+                    conn.executemany(
+                        "UPDATE Users SET total_downloads = total_downloads + ? WHERE telegram_id=?",
+                        [(n, tid) for tid, n in users.items()]
+                    )
+            except Exception as e:
+                logger.error(f"Hisoblagichlarni yozish xatosi: {e}")
+                if catalog:
+                    catalog.cancel_downloads()
+                self._restore(lessons, users)
+                raise
+
+            # Keshga qo'shish va inflight ni tozalash bitta lock ostida -
+            # downloads() oraliq holatni (ikki marta yoki umuman sanalmagan) ko'rmaydi
+            with self._lock:
+                if catalog:
+                    catalog.apply_downloads(lessons)
+                self._inflight_lessons = {}
+
+            total = sum(lessons.values())
+            logger.info(f"💾 Hisoblagichlar yozildi: {total} ta yuklanish, {len(users)} ta user")
+            return total
+
+    def _restore(self, lessons, users):
+        """Yozilmagan qiymatlarni buferga qaytarish"""
+        with self._lock:
+            self._inflight_lessons = {}
+            for code, n in lessons.items():
+                self._lesson_downloads[code] += n
+            for tid, n in users.items():
+                self._user_downloads[tid] += n
+
+    def _schedule_flush(self):
+        """Chegara to'lganda fon rejimida yozish"""
+        if self._flush_task and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_task = loop.create_task(self._safe_flush())
+
+    async def stop(self):
+        """To'xtatish va qolganlarini yozish"""
+        if self._flush_task and not self._flush_task.done():
+            await self._flush_task
+        await super().stop()
@@ -2,20 +2,34 @@
 Courses/Lessons Database - To'liq optimallashtirilgan
 """
 from .database import Database
-from datetime import datetime
+from .catalog import CatalogCache
+import re
+import time
 import pytz
 import logging
 
 logger = logging.getLogger(__name__)
 
+_DIGITS = re.compile(r'\d+')
+
+
+def natural_sort_key(title):
+    """Tabiiy tartib kaliti: raqamlar 10 xonagacha nol bilan to'ldiriladi
+
+    "Dars 2" < "Dars 10" oddiy satr solishtirishda ham to'g'ri chiqadi.
+    """
+    return _DIGITS.sub(lambda m: m.group().zfill(10), (title or "").lower())
+
 
 class CourseDatabase(Database):
     def __init__(self, path_to_db: str):
         super().__init__(path_to_db)
         self.tz = pytz.timezone("Asia/Tashkent")
+        self.catalog = CatalogCache(self)
 
     def _now(self):
-        return datetime.now(self.tz).isoformat()
+        """Unix epoch (soniya)"""
+        return int(time.time())
 
     def create_tables(self):
         """Jadvalarni yaratish"""
@@ -47,8 +61,9 @@ class CourseDatabase(Database):
                 file_id VARCHAR(2000) NOT NULL,
                 file_name TEXT,
                 file_size INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
                 count_download INTEGER DEFAULT 0,
+                sort_key TEXT,
                 FOREIGN KEY (fakultet_id) REFERENCES Fakultet(id) ON DELETE CASCADE,
                 FOREIGN KEY (mavzu_id) REFERENCES Mavzu(id) ON DELETE SET NULL
             )
@@ -63,6 +78,7 @@ class CourseDatabase(Database):
         """Fakultet qo'shish"""
         sql = "INSERT INTO Fakultet(name) VALUES(?)"
         self.execute(sql, (name,), commit=True)
+        self.catalog.invalidate_fakultetlar()
         logger.info(f"➕ Fakultet: {name}")
 
     def get_all_fakultetlar(self):
@@ -79,6 +95,8 @@ class CourseDatabase(Database):
         """Fakultetni o'chirish"""
         sql = "DELETE FROM Fakultet WHERE id=?"
         self.execute(sql, (fakultet_id,), commit=True)
+        self.catalog.invalidate_fakultetlar()
+        self.catalog.invalidate_fakultet(fakultet_id)
         logger.info(f"🗑 Fakultet deleted: {fakultet_id}")
 
     # ==================== MAVZU ====================
@@ -115,11 +133,13 @@ class CourseDatabase(Database):
 
         sql = """
         INSERT INTO Lesson(fakultet_id, mavzu_id, code, title, file_id, 
-                          file_name, file_size)
-        VALUES(?, ?, ?, ?, ?, ?, ?)
+                          file_name, file_size, created_at, sort_key)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
         self.execute(sql, (dars_id, mavzu_id, code, title, file_id,
-                           file_name, file_size), commit=True)
+                           file_name, file_size, self._now(),
+                           natural_sort_key(title)), commit=True)
+        self.catalog.invalidate_fakultet(dars_id)
         logger.info(f"➕ Dars: {code} - {title}")
 
     def get_dars_by_fakultet(self, fakultet_id):
@@ -129,7 +149,7 @@ class CourseDatabase(Database):
         FROM Lesson l
         LEFT JOIN Mavzu m ON l.mavzu_id = m.id
         WHERE l.fakultet_id = ?
-        ORDER BY m.name, l.title
+        ORDER BY m.name, l.sort_key
         """
         return self.execute(sql, (fakultet_id,), fetchall=True)
 
@@ -140,7 +160,7 @@ class CourseDatabase(Database):
         FROM Lesson l
         JOIN Mavzu m ON l.mavzu_id = m.id
         WHERE l.fakultet_id=? AND m.name=?
-        ORDER BY l.title
+        ORDER BY l.sort_key
         """
         return self.execute(sql, (fakultet_id, mavzu_name), fetchall=True)
 
@@ -149,10 +169,18 @@ class CourseDatabase(Database):
         sql = "SELECT * FROM Lesson WHERE code=?"
         return self.execute(sql, (code,), fetchone=True)
 
+    def search_dars_by_id(self, dars_id):
+        """Darsni ID bo'yicha topish"""
+        sql = "SELECT * FROM Lesson WHERE id=?"
+        return self.execute(sql, (dars_id,), fetchone=True)
+
     def delete_dars(self, code):
         """Darsni o'chirish"""
+        dars = self.execute("SELECT fakultet_id FROM Lesson WHERE code=?", (code,), fetchone=True)
         sql = "DELETE FROM Lesson WHERE code=?"
         self.execute(sql, (code,), commit=True)
+        if dars:
+            self.catalog.invalidate_fakultet(dars['fakultet_id'])
         logger.info(f"🗑 Dars deleted: {code}")
 
     def update_download_count(self, code):
@@ -203,6 +231,16 @@ class CourseDatabase(Database):
         """
         return self.execute(sql, (limit,), fetchall=True)
 
+    def get_latest_darslar(self, limit=20):
+        """Oxirgi darslar (file_id uzunligi bilan)"""
+        sql = """
+        SELECT code, title, created_at, length(file_id) as file_len
+        FROM Lesson
+        ORDER BY created_at DESC
+        LIMIT ?
+        """
+        return self.execute(sql, (limit,), fetchall=True)
+
     def get_fakultet_stats(self):
         """Fakultet statistikasi"""
         sql = """
@@ -218,11 +256,32 @@ class CourseDatabase(Database):
 
     def search_dars_by_title(self, fakultet_id, query):
         """Darslarni qidirish"""
+        return self.search_lessons(query, fakultet_id, limit=20)
+
+    # ==================== QIDIRUV (FTS5) ====================
+    @staticmethod
+    def _fts_query(query):
+        """Foydalanuvchi matnini xavfsiz FTS5 so'roviga aylantirish"""
+        tokens = re.findall(r"\w+", query.lower())
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def search_lessons(self, query, fakultet_id=None, limit=20):
+        """Darslarni nom, kod va mavzu bo'yicha qidirish (bm25 tartibida)"""
+        match = self._fts_query(query)
+        if not match:
+            return []
+
         sql = """
-        SELECT l.code, l.title
-        FROM Lesson l
-        WHERE l.fakultet_id=? AND l.title LIKE ?
-        ORDER BY l.title
-        LIMIT 20
+        SELECT l.id, l.code, l.title, l.count_download, m.name as mavzu_name
+        FROM LessonSearch
+        JOIN Lesson l ON l.id = LessonSearch.rowid
+        LEFT JOIN Mavzu m ON l.mavzu_id = m.id
+        WHERE LessonSearch MATCH ?
         """
-        return self.execute(sql, (fakultet_id, f"%{query}%"), fetchall=True)
\ No newline at end of file
+        params = [match]
+        if fakultet_id is not None:
+            sql += " AND LessonSearch.fakultet_id = ?"
+            params.append(fakultet_id)
+        sql += " ORDER BY bm25(LessonSearch, 10.0, 5.0, 2.0) LIMIT ?"
+        params.append(limit)
+        return self.execute(sql, tuple(params), fetchall=True)
\ No newline at end of file
@@ -2,8 +2,14 @@
 Optimallashtirilgan Database sinfi
 Dublikatlar tozalangan, logging yaxshilangan
 """
+import asyncio
+import functools
+import inspect
 import sqlite3
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
 logging.basicConfig(
@@ -13,19 +19,139 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Har bir yangi ulanishga qo'llaniladigan PRAGMA sozlamalari
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-16000",  # ~16 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Havzadagi ulanishlar va DB thread lar soni
+POOL_SIZE = 5
+
+
+class ConnectionPool:
+    """Iliq SQLite ulanishlari havzasi"""
+
+    def __init__(self, path_to_db, size=POOL_SIZE):
+        self.path_to_db = path_to_db
+        self.size = size
+        self._pool = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        """Yangi ulanish yaratish va PRAGMA larni qo'llash"""
+        conn = sqlite3.connect(self.path_to_db, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Dict kabi ishlash uchun
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        """Havzadan ulanish olish"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        # Havza to'la - bo'shagan ulanishni kutish
+        return self._pool.get()
+
+    def release(self, conn):
+        """Ulanishni havzaga qaytarish"""
+        if self._closed:
+            conn.close()
+            return
+        self._pool.put_nowait(conn)
+
+    def close(self):
+        """Barcha ulanishlarni yopish"""
+        self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_executor = None
+
+
+def get_pool(path_to_db):
+    """Bitta fayl uchun umumiy havza"""
+    with _pools_lock:
+        pool = _pools.get(path_to_db)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(path_to_db)
+            _pools[path_to_db] = pool
+            logger.info(f"Connection pool: {path_to_db} ({pool.size} ta ulanish)")
+        return pool
+
+
+def get_executor():
+    """So'rovlar uchun alohida thread pool"""
+    global _executor
+    with _pools_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db")
+        return _executor
+
+
+def _async_method(name):
+    """Sinxron metodning async varianti"""
+    async def method(self, *args, **kwargs):
+        return await self.run(getattr(self, name), *args, **kwargs)
+
+    method.__name__ = f"{name}_async"
+    method.__doc__ = f"{name}() - async (executor da)"
+    return method
+
 
 class Database:
-    """Asosiy database sinfi"""
+    """Asosiy database sinfi
+
+    Har bir ochiq metod uchun avtomatik `<metod>_async` varianti yaratiladi,
+    u so'rovni alohida thread pool da bajaradi va event loop ni to'xtatmaydi.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(vars(cls).items()):
+            if name.startswith('_') or name.endswith('_async'):
+                continue
+            if not inspect.isfunction(attr) or inspect.iscoroutinefunction(attr):
+                continue
+            if inspect.isgeneratorfunction(attr) or f"{name}_async" in vars(cls):
+                continue
+            setattr(cls, f"{name}_async", _async_method(name))
 
     def __init__(self, path_to_db="main.db"):
         self.path_to_db = path_to_db
+        self.pool = get_pool(path_to_db)
         logger.info(f"Database initialized: {path_to_db}")
 
     @contextmanager
     def get_connection(self):
         """Context manager bilan xavfsiz ulanish"""
-        conn = sqlite3.connect(self.path_to_db)
-        conn.row_factory = sqlite3.Row  # Dict kabi ishlash uchun
+        conn = self.pool.acquire()
         try:
             yield conn
             conn.commit()
@@ -34,7 +160,7 @@ class Database:
             logger.error(f"Database error: {e}")
             raise
         finally:
-            conn.close()
+            self.pool.release(conn)
 
     def execute(self, sql: str, parameters: tuple = None,
                 fetchone=False, fetchall=False, commit=False):
@@ -58,4 +184,26 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.executemany(sql, data)
-            return cursor.rowcount
\ No newline at end of file
+            return cursor.rowcount
+
+    def close(self):
+        """Havzadagi ulanishlarni yopish"""
+        self.pool.close()
+
+    # ==================== ASYNC ====================
+    async def run(self, func, *args, **kwargs):
+        """Sinxron funksiyani DB thread pool da bajarish"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), functools.partial(func, *args, **kwargs)
+        )
+
+    async def execute_async(self, sql: str, parameters: tuple = None,
+                            fetchone=False, fetchall=False, commit=False):
+        """execute() - async"""
+        return await self.run(self.execute, sql, parameters,
+                              fetchone=fetchone, fetchall=fetchall, commit=commit)
+
+    async def executemany_async(self, sql: str, data: list):
+        """executemany() - async"""
+        return await self.run(self.executemany, sql, data)
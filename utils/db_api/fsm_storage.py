@@ -0,0 +1,278 @@
+"""
+FSM storage - holatlar SQLite da saqlanadi, bot qayta ishga tushsa ham yo'qolmaydi
+"""
+import asyncio
+import copy
+import datetime
+import json
+import logging
+import time
+
+from aiogram import types
+from aiogram.dispatcher.storage import BaseStorage
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== SERIALIZATSIYA ====================
+def _encode(value):
+    """JSON ga sig'maydigan qiymatlar (Message, datetime) uchun belgi"""
+    if isinstance(value, types.base.TelegramObject):
+        return {'__tg__': type(value).__name__, 'value': value.to_python()}
+    if isinstance(value, datetime.datetime):
+        return {'__dt__': value.isoformat()}
+    raise TypeError(f"FSM da saqlab bo'lmaydigan qiymat: {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__tg__' in obj:
+        cls = getattr(types, obj['__tg__'], None)
+        return cls.to_object(obj['value']) if cls else obj['value']
+    if '__dt__' in obj:
+        return datetime.datetime.fromisoformat(obj['__dt__'])
+    return obj
+
+
+def dump_data(data):
+    return json.dumps(data, default=_encode, ensure_ascii=False)
+
+
+def load_data(raw):
+    return json.loads(raw, object_hook=_decode) if raw else {}
+
+
+class FSMDatabase(Database):
+    """fsm_states jadvali"""
+
+    def __init__(self, path_to_db):
+        super().__init__(path_to_db)
+        self.create_table()
+
+    def create_table(self):
+        """FSM jadvalini yaratish"""
+        self.execute('''
+            CREATE TABLE IF NOT EXISTS fsm_states (
+                chat TEXT NOT NULL,
+                user TEXT NOT NULL,
+                state TEXT,
+                data TEXT,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY (chat, user)
+            ) WITHOUT ROWID
+        ''', commit=True)
+
+    def load_states(self, min_updated_at):
+        """Muddati o'tmagan holatlar (eskilari o'chiriladi)"""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (min_updated_at,))
+            return conn.execute(
+                "SELECT chat, user, state, data, updated_at FROM fsm_states"
+            ).fetchall()
+
+    def save_states(self, rows, deleted):
+        """Bitta tranzaksiyada yozish: rows - [(chat, user, state, data, updated_at)]"""
+        with self.get_connection() as conn:
+            if rows:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fsm_states(chat, user, state, data, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+            if deleted:
+                conn.executemany("DELETE FROM fsm_states WHERE chat=? AND user=?", deleted)
+
+
+class SQLiteStorage(BaseStorage):
+    """MemoryStorage o'rniga - xotira + SQLite
+
+    O'qish va yozish xotiradan (MemoryStorage kabi tez), o'zgargan yozuvlar
+    har `flush_interval` soniyada bitta tranzaksiyada DB ga yoziladi.
+    `ttl` soniya tegilmagan holatlar (tashlab ketilgan jarayonlar) o'chiriladi.
+    Bucketlar faqat xotirada.
+    """
+
+    def __init__(self, path_to_db, flush_interval=2, ttl=86400):
+        self.db = FSMDatabase(path_to_db)
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+
+        self.data = {}  # {(chat, user): {'state', 'data', 'updated_at'}}
+        self.buckets = {}
+        self._dirty = set()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+
+        self.flushes = 0
+        self.expired = 0
+
+    # ==================== XOTIRA ====================
+    async def load(self):
+        """DB dagi holatlarni xotiraga o'qish (bir marta)"""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            rows = await self.db.load_states_async(int(time.time()) - self.ttl)
+            for row in rows:
+                key = (row['chat'], row['user'])
+                # Yuklash paytida yozilgan yangi qiymatlar ustun
+                if key in self.data:
+                    continue
+                try:
+                    data = load_data(row['data'])
+                except Exception as e:
+                    logger.warning(f"FSM yozuvini o'qib bo'lmadi {key}: {e}")
+                    data = {}
+                self.data[key] = {'state': row['state'], 'data': data, 'updated_at': row['updated_at']}
+            self._loaded = True
+            logger.info(f"💾 FSM holatlari yuklandi: {len(self.data)} ta")
+
+    async def _entry(self, chat, user, create=False):
+        if not self._loaded:
+            await self.load()
+        chat, user = map(str, self.check_address(chat=chat, user=user))
+        key = (chat, user)
+        entry = self.data.get(key)
+        if entry is None and create:
+            entry = self.data[key] = {'state': None, 'data': {}, 'updated_at': 0}
+        return key, entry
+
+    def _touch(self, key, entry):
+        entry['updated_at'] = int(time.time())
+        self._dirty.add(key)
+        # Bo'sh yozuv saqlanmaydi - flush da DB dan o'chiriladi
+        if entry['state'] is None and not entry['data']:
+            self.data.pop(key, None)
+
+    # ==================== BaseStorage ====================
+    async def get_state(self, *, chat=None, user=None, default=None):
+        _, entry = await self._entry(chat, user)
+        state = entry['state'] if entry else None
+        return state if state is not None else self.resolve_state(default)
+
+    async def get_data(self, *, chat=None, user=None, default=None):
+        _, entry = await self._entry(chat, user)
+        if entry:
+            return copy.deepcopy(entry['data'])
+        return copy.deepcopy(default or {})
+
+    async def set_state(self, *, chat=None, user=None, state=None):
+        key, entry = await self._entry(chat, user, create=True)
+        entry['state'] = self.resolve_state(state)
+        self._touch(key, entry)
+
+    async def set_data(self, *, chat=None, user=None, data=None):
+        key, entry = await self._entry(chat, user, create=True)
+        entry['data'] = copy.deepcopy(data or {})
+        self._touch(key, entry)
+
+    async def update_data(self, *, chat=None, user=None, data=None, **kwargs):
+        if data is None:
+            data = {}
+        key, entry = await self._entry(chat, user, create=True)
+        entry['data'].update(data, **kwargs)
+        self._touch(key, entry)
+
+    async def reset_state(self, *, chat=None, user=None, with_data=True):
+        await self.set_state(chat=chat, user=user, state=None)
+        if with_data:
+            await self.set_data(chat=chat, user=user, data={})
+
+    def has_bucket(self):
+        return True
+
+    async def get_bucket(self, *, chat=None, user=None, default=None):
+        chat, user = map(str, self.check_address(chat=chat, user=user))
+        return copy.deepcopy(self.buckets.get((chat, user), default or {}))
+
+    async def set_bucket(self, *, chat=None, user=None, bucket=None):
+        chat, user = map(str, self.check_address(chat=chat, user=user))
+        self.buckets[(chat, user)] = copy.deepcopy(bucket or {})
+
+    async def update_bucket(self, *, chat=None, user=None, bucket=None, **kwargs):
+        if bucket is None:
+            bucket = {}
+        chat, user = map(str, self.check_address(chat=chat, user=user))
+        self.buckets.setdefault((chat, user), {}).update(bucket, **kwargs)
+
+    # ==================== YOZISH ====================
+    def _expire(self):
+        """Muddati o'tgan holatlarni xotiradan olib tashlash"""
+        deadline = int(time.time()) - self.ttl
+        stale = [key for key, entry in self.data.items() if entry['updated_at'] < deadline]
+        for key in stale:
+            del self.data[key]
+            self._dirty.add(key)
+        self.expired += len(stale)
+        return len(stale)
+
+    async def flush(self):
+        """O'zgargan holatlarni DB ga yozish"""
+        async with self._flush_lock:
+            self._expire()
+            if not self._dirty:
+                return 0
+
+            dirty, self._dirty = self._dirty, set()
+            rows, deleted = [], []
+            # Serializatsiya event loop da - ma'lumotlar yozish paytida o'zgarmaydi
+            for key in dirty:
+                entry = self.data.get(key)
+                if entry is None:
+                    deleted.append(key)
+                    continue
+                try:
+                    rows.append((*key, entry['state'], dump_data(entry['data']), entry['updated_at']))
+                except Exception as e:
+                    logger.error(f"FSM ma'lumotini saqlab bo'lmadi {key}: {e}")
+
+            try:
+                await self.db.save_states_async(rows, deleted)
+            except Exception as e:
+                logger.error(f"FSM yozish xatosi: {e}")
+                self._dirty |= dirty
+                raise
+
+            self.flushes += 1
+            return len(dirty)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass  # Keyingi safar qayta urinish
+
+    def start(self):
+        """Xotiraga yuklash va davriy yozishni boshlash"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._start())
+
+    async def _start(self):
+        await self.load()
+        await self._run()
+
+    async def close(self):
+        """To'xtatish va qolganlarini yozish"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._dirty:
+            await self.flush()
+
+    async def wait_closed(self):
+        pass
+
+    def get_stats(self) -> dict:
+        """Storage statistikasi"""
+        return {
+            'states': len(self.data),
+            'dirty': len(self._dirty),
+            'flushes': self.flushes,
+            'expired': self.expired,
+            'ttl': self.ttl
+        }
@@ -0,0 +1,143 @@
+"""
+Sxema migratsiyalari - PRAGMA user_version asosida
+"""
+import logging
+
+from .courses import natural_sort_key
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch_backfill(table, column):
+    """ISO/CURRENT_TIMESTAMP satrlarini Unix epoch ga o'tkazish"""
+    return (
+        f"UPDATE {table} SET {column} = CAST(strftime('%s', {column}) AS INTEGER) "
+        f"WHERE typeof({column}) = 'text'"
+    )
+
+
+def _add_column(table, column, declaration):
+    """Ustun qo'shish (yangi bazada CREATE TABLE da allaqachon bo'ladi)"""
+    def step(conn):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        # Jadval hali yo'q - keyin CREATE TABLE ustun bilan yaratadi
+        if columns and column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    return step
+
+
+def _backfill_lesson_sort_key(conn):
+    """Mavjud darslar uchun tabiiy tartib kaliti"""
+    rows = conn.execute("SELECT id, title FROM Lesson WHERE sort_key IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE Lesson SET sort_key=? WHERE id=?",
+        [(natural_sort_key(title), lesson_id) for lesson_id, title in rows]
+    )
+
+
+# (versiya, tavsif, qadamlar) - qadam SQL satr yoki conn qabul qiluvchi funksiya.
+# Yangi migratsiya faqat ro'yxat oxiriga qo'shiladi, eskilari o'zgartirilmaydi.
+MIGRATIONS = [
+    (1, "Users indekslari", [
+        "CREATE INDEX IF NOT EXISTS idx_users_last_active ON Users(last_active, is_blocked)",
+        "CREATE INDEX IF NOT EXISTS idx_users_created_at ON Users(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_users_faculty ON Users(faculty, is_blocked)",
+        "CREATE INDEX IF NOT EXISTS idx_users_is_admin ON Users(is_admin) WHERE is_admin=1",
+    ]),
+    (2, "Lesson indekslari", [
+        "CREATE INDEX IF NOT EXISTS idx_lesson_fakultet_mavzu ON Lesson(fakultet_id, mavzu_id)",
+        "CREATE INDEX IF NOT EXISTS idx_lesson_count_download ON Lesson(count_download)",
+    ]),
+    (3, "Vaqt ustunlari Unix epoch ga", [
+        _epoch_backfill("Users", "created_at"),
+        _epoch_backfill("Users", "last_active"),
+        _epoch_backfill("Lesson", "created_at"),
+    ]),
+    (4, "FTS5 dars qidiruvi", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS LessonSearch USING fts5(
+            title, code, mavzu, fakultet_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS lesson_search_ai AFTER INSERT ON Lesson BEGIN
+            INSERT INTO LessonSearch(rowid, title, code, mavzu, fakultet_id)
+            VALUES (new.id, new.title, new.code,
+                    (SELECT name FROM Mavzu WHERE id = new.mavzu_id), new.fakultet_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS lesson_search_ad AFTER DELETE ON Lesson BEGIN
+            DELETE FROM LessonSearch WHERE rowid = old.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS lesson_search_au
+        AFTER UPDATE OF title, code, mavzu_id, fakultet_id ON Lesson BEGIN
+            UPDATE LessonSearch
+            SET title = new.title, code = new.code, fakultet_id = new.fakultet_id,
+                mavzu = (SELECT name FROM Mavzu WHERE id = new.mavzu_id)
+            WHERE rowid = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS mavzu_search_au AFTER UPDATE OF name ON Mavzu BEGIN
+            UPDATE LessonSearch SET mavzu = new.name
+            WHERE rowid IN (SELECT id FROM Lesson WHERE mavzu_id = new.id);
+        END
+        """,
+        """
+        INSERT INTO LessonSearch(rowid, title, code, mavzu, fakultet_id)
+        SELECT l.id, l.title, l.code, m.name, l.fakultet_id
+        FROM Lesson l
+        LEFT JOIN Mavzu m ON l.mavzu_id = m.id
+        """,
+    ]),
+    (5, "Darslar uchun tabiiy tartib kaliti", [
+        _add_column("Lesson", "sort_key", "TEXT"),
+        _backfill_lesson_sort_key,
+        # (fakultet_id, mavzu_id) indeksi yangisining prefiksi - ortiqcha
+        "DROP INDEX IF EXISTS idx_lesson_fakultet_mavzu",
+        "CREATE INDEX IF NOT EXISTS idx_lesson_sort ON Lesson(fakultet_id, mavzu_id, sort_key)",
+    ]),
+    (6, "Reklama vazifalarida qayta urinishlar soni", [
+        _add_column("broadcast_jobs", "retried", "INTEGER NOT NULL DEFAULT 0"),
+    ]),
+    (7, "Reklama auditoriyasi - faqat bloklanmaganlar", [
+        # Keyset sahifalash (id > ? ... ORDER BY id) bloklanganlarni o'qimaydi
+        "CREATE INDEX IF NOT EXISTS idx_users_reachable ON Users(id, telegram_id) WHERE is_blocked=0",
+    ]),
+]
+
+
+def get_version(db):
+    """Joriy sxema versiyasi"""
+    result = db.execute("PRAGMA user_version", fetchone=True)
+    return result[0] if result else 0
+
+
+def apply_migrations(db):
+    """Qo'llanmagan migratsiyalarni tartib bilan bajarish"""
+    current = get_version(db)
+    applied = 0
+
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+
+        with db.get_connection() as conn:
+            conn.execute("BEGIN")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version={int(version)}")
+
+        applied += 1
+        logger.info(f"🧩 Migratsiya {version}: {description}")
+
+    if applied:
+        logger.info(f"✅ Sxema versiyasi: {get_version(db)}")
+    return applied
@@ -5,19 +5,31 @@ from .database import Database
 from datetime import datetime, timedelta
 import pytz
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 
 class UserDatabase(Database):
-    def __init__(self, path_to_db: str):
+    DASHBOARD_TTL = 30  # soniya
+
+    def __init__(self, path_to_db: str, admins=()):
         super().__init__(path_to_db)
         self.tz = pytz.timezone("Asia/Tashkent")
+        self._dashboard = None  # (vaqt, stats)
+        self._dashboard_lock = threading.Lock()
+        self._config_admins = frozenset(admins)  # data.config.ADMINS
+        self._db_admins = None  # {telegram_id} - is_admin=1 bo'lganlar
 
     def _now(self):
         """Joriy vaqt"""
         return datetime.now(self.tz)
 
+    def _ts(self, date=None):
+        """Unix epoch (soniya)"""
+        return int((date or self._now()).timestamp())
+
     def _start_of_day(self, date=None):
         """Kun boshlanishi"""
         d = date or self._now()
@@ -35,8 +47,8 @@ class UserDatabase(Database):
             faculty VARCHAR(255),
             is_blocked BOOLEAN DEFAULT 0,
             is_admin BOOLEAN DEFAULT 0,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            last_active DATETIME,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            last_active INTEGER,
             total_downloads INTEGER DEFAULT 0
         )
         """
@@ -52,7 +64,7 @@ class UserDatabase(Database):
                                     last_name, faculty, created_at, last_active) 
         VALUES(?, ?, ?, ?, ?, ?, ?)
         """
-        now = self._now().isoformat()
+        now = self._ts()
         self.execute(sql, (telegram_id, username, first_name,
                           last_name, faculty, now, now), commit=True)
 
@@ -72,7 +84,7 @@ class UserDatabase(Database):
     def update_last_active(self, telegram_id):
         """Faollik vaqtini yangilash"""
         sql = "UPDATE Users SET last_active=? WHERE telegram_id=?"
-        self.execute(sql, (self._now().isoformat(), telegram_id), commit=True)
+        self.execute(sql, (self._ts(), telegram_id), commit=True)
 
     # ==================== FAKULTET ====================
     def update_faculty(self, telegram_id, faculty):
@@ -86,20 +98,40 @@ class UserDatabase(Database):
         return user['faculty'] if user else None
 
     # ==================== ADMIN ====================
+    def load_admins(self, config_admins=None):
+        """Admin ID larini xotiraga yuklash (config + DB)"""
+        if config_admins is not None:
+            self._config_admins = frozenset(config_admins)
+        sql = "SELECT telegram_id FROM Users WHERE is_admin=1"
+        self._db_admins = {row['telegram_id'] for row in self.execute(sql, fetchall=True)}
+        logger.info(f"👑 Adminlar keshi: {len(self._config_admins)} config, {len(self._db_admins)} DB")
+
+    def _admin_ids(self):
+        if self._db_admins is None:
+            self.load_admins()
+        return self._db_admins
+
+    def is_admin(self, telegram_id):
+        """Config yoki DB admini (xotiradan, so'rovsiz)"""
+        return telegram_id in self._config_admins or telegram_id in self._admin_ids()
+
     def check_if_admin(self, telegram_id):
         """Admin tekshirish"""
-        user = self.select_user(telegram_id)
-        return bool(user and user['is_admin'])
+        return telegram_id in self._admin_ids()
 
     def set_admin(self, telegram_id):
         """Admin qilish"""
         sql = "UPDATE Users SET is_admin=1 WHERE telegram_id=?"
-        self.execute(sql, (telegram_id,), commit=True)
+        with self.get_connection() as conn:
+            updated = conn.execute(sql, (telegram_id,)).rowcount
+        if updated:
+            self._admin_ids().add(telegram_id)
 
     def remove_admin(self, telegram_id):
         """Adminlikdan olish"""
         sql = "UPDATE Users SET is_admin=0 WHERE telegram_id=?"
         self.execute(sql, (telegram_id,), commit=True)
+        self._admin_ids().discard(telegram_id)
 
     def get_all_admins(self):
         """Barcha adminlar"""
@@ -121,21 +153,21 @@ class UserDatabase(Database):
         today = self._start_of_day()
         tomorrow = today + timedelta(days=1)
         sql = "SELECT COUNT(*) FROM Users WHERE created_at >= ? AND created_at < ?"
-        result = self.execute(sql, (today.isoformat(), tomorrow.isoformat()), fetchone=True)
+        result = self.execute(sql, (self._ts(today), self._ts(tomorrow)), fetchone=True)
         return result[0] if result else 0
 
     def count_weekly_users(self):
         """Haftalik yangi foydalanuvchilar"""
         week_ago = self._now() - timedelta(days=7)
         sql = "SELECT COUNT(*) FROM Users WHERE created_at >= ?"
-        result = self.execute(sql, (week_ago.isoformat(),), fetchone=True)
+        result = self.execute(sql, (self._ts(week_ago),), fetchone=True)
         return result[0] if result else 0
 
     def count_monthly_users(self):
         """Oylik yangi foydalanuvchilar"""
         month_ago = self._now() - timedelta(days=30)
         sql = "SELECT COUNT(*) FROM Users WHERE created_at >= ?"
-        result = self.execute(sql, (month_ago.isoformat(),), fetchone=True)
+        result = self.execute(sql, (self._ts(month_ago),), fetchone=True)
         return result[0] if result else 0
 
     def count_active_daily_users(self):
@@ -146,23 +178,60 @@ class UserDatabase(Database):
         SELECT COUNT(*) FROM Users 
         WHERE last_active >= ? AND last_active < ? AND is_blocked=0
         """
-        result = self.execute(sql, (today.isoformat(), tomorrow.isoformat()), fetchone=True)
+        result = self.execute(sql, (self._ts(today), self._ts(tomorrow)), fetchone=True)
         return result[0] if result else 0
 
     def count_active_weekly_users(self):
         """Hafta faol foydalanuvchilar"""
         week_ago = self._now() - timedelta(days=7)
         sql = "SELECT COUNT(*) FROM Users WHERE last_active >= ? AND is_blocked=0"
-        result = self.execute(sql, (week_ago.isoformat(),), fetchone=True)
+        result = self.execute(sql, (self._ts(week_ago),), fetchone=True)
         return result[0] if result else 0
 
     def count_active_monthly_users(self):
         """Oy faol foydalanuvchilar"""
         month_ago = self._now() - timedelta(days=30)
         sql = "SELECT COUNT(*) FROM Users WHERE last_active >= ? AND is_blocked=0"
-        result = self.execute(sql, (month_ago.isoformat(),), fetchone=True)
+        result = self.execute(sql, (self._ts(month_ago),), fetchone=True)
         return result[0] if result else 0
 
+    def get_dashboard_stats(self):
+        """Jami, yangi va faol foydalanuvchilar - bitta skanerda"""
+        now = self._now()
+        today = self._start_of_day(now)
+        params = {
+            'today': self._ts(today),
+            'tomorrow': self._ts(today + timedelta(days=1)),
+            'week_ago': self._ts(now - timedelta(days=7)),
+            'month_ago': self._ts(now - timedelta(days=30)),
+        }
+        sql = """
+        SELECT
+            COUNT(*) AS all_users,
+            TOTAL(is_blocked=0) AS total,
+            TOTAL(created_at >= :today AND created_at < :tomorrow) AS daily,
+            TOTAL(created_at >= :week_ago) AS weekly,
+            TOTAL(created_at >= :month_ago) AS monthly,
+            TOTAL(is_blocked=0 AND last_active >= :today
+                  AND last_active < :tomorrow) AS active_daily,
+            TOTAL(is_blocked=0 AND last_active >= :week_ago) AS active_weekly,
+            TOTAL(is_blocked=0 AND last_active >= :month_ago) AS active_monthly
+        FROM Users
+        """
+        row = self.execute(sql, params, fetchone=True)
+        return {key: int(row[key] or 0) for key in row.keys()}
+
+    def get_dashboard_snapshot(self, ttl=None):
+        """Keshlangan dashboard (admin tugmani qayta bossa skaner qilinmaydi)"""
+        ttl = self.DASHBOARD_TTL if ttl is None else ttl
+        with self._dashboard_lock:
+            if self._dashboard and time.monotonic() - self._dashboard[0] < ttl:
+                return self._dashboard[1]
+
+            stats = self.get_dashboard_stats()
+            self._dashboard = (time.monotonic(), stats)
+            return stats
+
     def count_users_by_faculty(self, faculty):
         """Fakultet bo'yicha foydalanuvchilar"""
         sql = "SELECT COUNT(*) FROM Users WHERE faculty=? AND is_blocked=0"
@@ -202,6 +271,43 @@ class UserDatabase(Database):
         sql = "SELECT * FROM Users ORDER BY created_at DESC"
         return self.execute(sql, fetchall=True)
 
+    # ==================== KEYSET ITERATSIYA ====================
+    def get_user_ids_after(self, last_id=0, batch_size=500, where=None):
+        """id > last_id bo'lgan keyingi sahifa (faqat id va telegram_id)
+
+        where - (shart, parametrlar): shartda faqat ? belgilar, qiymatlar
+        parametrlar orqali bog'lanadi.
+        """
+        clause, params = where or ("", ())
+        sql = "SELECT id, telegram_id FROM Users WHERE id > ?"
+        if clause:
+            sql += f" AND ({clause})"
+        sql += " ORDER BY id LIMIT ?"
+        return self.execute(sql, (last_id, *params, batch_size), fetchall=True)
+
+    def get_max_user_id(self):
+        """Eng katta Users.id (auditoriya surati uchun)"""
+        result = self.execute("SELECT MAX(id) FROM Users", fetchone=True)
+        return result[0] if result and result[0] else 0
+
+    def count_users_where(self, where=None):
+        """Shart bo'yicha foydalanuvchilar soni (where - get_user_ids_after dagidek)"""
+        clause, params = where or ("", ())
+        sql = "SELECT COUNT(*) FROM Users"
+        if clause:
+            sql += f" WHERE {clause}"
+        result = self.execute(sql, tuple(params), fetchone=True)
+        return result[0] if result else 0
+
+    async def iter_user_id_batches_async(self, last_id=0, batch_size=500, where=None):
+        """(kursor, [telegram_id, ...]) partiyalari - kursordan davom ettirish uchun"""
+        while True:
+            rows = await self.get_user_ids_after_async(last_id, batch_size, where)
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            yield last_id, [row['telegram_id'] for row in rows]
+
     def search_users(self, query):
         """Qidirish"""
         sql = """
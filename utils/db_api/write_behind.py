@@ -0,0 +1,61 @@
+"""
+Write-behind bufer - xotirada yig'ib, davriy ravishda DB ga yozish
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Davriy yozuvchi buferlar uchun asos
+
+    Voris `flush()` ni yozadi (sinxron, DB executor ida ishlaydi). Xatolikda
+    `flush()` qiymatlarni buferga qaytarib, istisnoni qayta ko'taradi -
+    fon vazifa keyingi safar qayta urinadi, `stop()` esa chaqiruvchiga bildiradi.
+    """
+
+    CHUNK_SIZE = 500  # SQLite parametrlar chegarasi uchun
+
+    def __init__(self, db, flush_interval):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._task = None
+
+    def flush(self):
+        """Yig'ilganlarni yozish (yozilganlar soni)"""
+        raise NotImplementedError
+
+    def _update_in_chunks(self, conn, sql, value, ids):
+        """`sql` dagi {} o'rniga IN (...) - ids bo'laklab, `value` bilan"""
+        for i in range(0, len(ids), self.CHUNK_SIZE):
+            chunk = ids[i:i + self.CHUNK_SIZE]
+            conn.execute(sql.format(",".join("?" * len(chunk))), (value, *chunk))
+
+    async def flush_async(self):
+        """flush() - async"""
+        return await self.db.run(self.flush)
+
+    async def _safe_flush(self):
+        try:
+            await self.flush_async()
+        except Exception:
+            pass  # Qiymatlar buferda qoldi, keyingi safar yoziladi
+
+    # ==================== FON VAZIFA ====================
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._safe_flush()
+
+    def start(self):
+        """Davriy yozishni boshlash"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """To'xtatish va qolganlarini yozish"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush_async()
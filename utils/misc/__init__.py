@@ -1,2 +1,3 @@
 from .throttling import rate_limit
+from .dates import format_date
 from . import logging
@@ -0,0 +1,131 @@
+"""
+Cheklangan TTL/LRU kesh - xotira o'smasligi uchun
+"""
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Hajmi cheklangan, muddati tugaydigan kesh
+
+    Har bir yozuv o'z muddati bilan saqlanadi (`set(..., ttl=)`), to'lganda
+    eng uzoq ishlatilmagan yozuv chiqariladi. Event loop ichida ishlatish
+    uchun mo'ljallangan (lock yo'q).
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Joy uchun chiqarilganlar
+        self.expirations = 0  # Muddati tugaganlar
+
+        self._data = OrderedDict()  # {key: (expires_at, value)}
+
+    def get(self, key, default=None):
+        """Qiymat yoki default"""
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Qiymat yozish (ttl - soniya, berilmasa standart)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Yozuvni o'chirish"""
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def purge(self):
+        """Muddati tugagan yozuvlarni tozalash"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        """Butun keshni tozalash"""
+        self._data.clear()
+
+    def __contains__(self, key):
+        item = self._data.get(key)
+        return item is not None and item[0] > time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Kesh statistikasi"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class VersionedCache:
+    """Manba versiyasiga bog'langan kesh (masalan, tayyor klaviaturalar)
+
+    `source.version` o'zgarsa, barcha yozuvlar eskirgan hisoblanadi.
+    Qiymat qurishdan oldin `version` olinadi va `set` ga beriladi -
+    qurish paytida manba o'zgargan bo'lsa, eskirgan qiymat saqlanmaydi.
+    """
+
+    def __init__(self, source, maxsize=1000):
+        self.source = source
+        self._version = source.version
+        self._cache = TTLCache(maxsize=maxsize, ttl=float('inf'))
+
+    @property
+    def version(self):
+        return self.source.version
+
+    def _sync(self):
+        if self._version != self.source.version:
+            self._cache.clear()
+            self._version = self.source.version
+
+    def get(self, key, default=None):
+        """Joriy versiya uchun qiymat"""
+        self._sync()
+        return self._cache.get(key, default)
+
+    def set(self, key, value, version):
+        """Qiymatni saqlash (faqat versiya o'zgarmagan bo'lsa)"""
+        self._sync()
+        if version == self._version:
+            self._cache.set(key, value)
+
+    def stats(self) -> dict:
+        """Kesh statistikasi"""
+        return {**self._cache.stats(), 'version': self._version}
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+import pytz
+
+TZ = pytz.timezone("Asia/Tashkent")
+
+
+def format_date(value, fmt="%Y-%m-%d"):
+    """
+    Unix epoch qiymatini sana ko'rinishida chiqarish.
+
+    :param value: epoch (int) yoki eski ISO satr
+    :param fmt: strftime formati
+    :return: str
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value[:10]
+    return datetime.fromtimestamp(int(value), TZ).strftime(fmt)
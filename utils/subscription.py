@@ -0,0 +1,322 @@
+"""
+Obuna xizmati - majburiy kanallarga obunani yagona joyda tekshirish
+"""
+import asyncio
+import logging
+
+from utils.db_api.channel import SUBSCRIBED_STATUSES
+from utils.misc.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionService:
+    """Middleware, /start va kanal bo'limi uchun umumiy obuna tekshiruvi
+
+    Natija uch qatlamdan olinadi: xotiradagi (user, kanal) keshi,
+    chat_member yangilanishlaridan yig'ilgan channel_members jadvali va
+    oxirgi chora sifatida Bot API (get_chat_member).
+    """
+
+    CACHE_SIZE = 50000
+    POSITIVE_TTL = 300  # Obuna bo'lgan - 5 daqiqa
+    NEGATIVE_TTL = 10  # Obuna bo'lmagan - tez qayta tekshiriladi
+    MEMBERSHIP_MAX_AGE = 86400  # channel_members dagi yozuv shu muddatgacha ishonchli
+    MAX_CONCURRENT_CHECKS = 10  # Bir vaqtdagi get_chat_member so'rovlari
+
+    def __init__(self, bot, channel_db):
+        self.bot = bot
+        self.channel_db = channel_db
+
+        self._cache = TTLCache(maxsize=self.CACHE_SIZE, ttl=self.POSITIVE_TTL)
+        self._api_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CHECKS)
+        self._inflight = {}  # {(user_id, fresh): Task} - bir foydalanuvchi uchun bitta tekshiruv
+
+        self.api_calls = 0
+        self.api_errors = 0
+        self.table_hits = 0
+        self.shared_checks = 0  # Boshqa so'rovning natijasini kutganlar
+
+    # ==================== TEKSHIRUV ====================
+    async def check(self, user_id: int, fresh: bool = False) -> list:
+        """Barcha kanallar bo'yicha natija: [(channel_id, title, link, obuna), ...]
+
+        fresh=True - "Tekshirish" tugmasi uchun, keshdagi va jadvaldagi salbiy
+        natijalar e'tiborsiz (Bot API dan qayta so'raladi).
+        Bir foydalanuvchi uchun parallel kelgan so'rovlar bitta tekshiruvni kutadi.
+        Oddiy so'rov fresh tekshiruvga qo'shilishi mumkin, aksincha emas -
+        fresh so'rov keshdan olingan natijani qabul qilmaydi.
+        """
+        task = self._inflight.get((user_id, True))
+        if task is None and not fresh:
+            task = self._inflight.get((user_id, False))
+        if task is None:
+            key = (user_id, fresh)
+            task = asyncio.ensure_future(self._check_once(user_id, fresh))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared_checks += 1
+        # shield - bitta kutuvchi bekor qilinsa, boshqalar uchun tekshiruv davom etadi
+        return await asyncio.shield(task)
+
+    async def _check_once(self, user_id: int, fresh: bool) -> list:
+        channels = await self.channel_db.get_all_channels_async()
+        if not channels:
+            return []
+
+        # Kanallar parallel tekshiriladi (API so'rovlari semafor ostida)
+        results = await asyncio.gather(*(
+            self._check_channel(user_id, channel_id, fresh)
+            for channel_id, _, _ in channels
+        ))
+        return [
+            (channel_id, title, link, subscribed)
+            for (channel_id, title, link), subscribed in zip(channels, results)
+        ]
+
+    async def _check_channel(self, user_id: int, channel_id: int, fresh: bool) -> bool:
+        """Bitta kanal: kesh -> jadval -> Bot API"""
+        key = (user_id, channel_id)
+        cached = self._cache.get(key)
+        if cached or (cached is False and not fresh):
+            return cached
+
+        try:
+            # chat_member yangilanishlaridan yig'ilgan jadval
+            subscribed = await self.channel_db.get_member_status_async(
+                channel_id, user_id, max_age=self.MEMBERSHIP_MAX_AGE
+            )
+
+            # fresh - salbiy yozuv eskirgan bo'lishi mumkin (qayta qo'shilish
+            # yangilanishi o'tkazib yuborilgan), API dan so'raladi
+            if subscribed is None or (fresh and not subscribed):
+                stale = subscribed is False
+                self.api_calls += 1
+                async with self._api_semaphore:
+                    member = await self.bot.get_chat_member(chat_id=channel_id, user_id=user_id)
+                subscribed = member.status in SUBSCRIBED_STATUSES
+                # Ijobiy natija saqlanadi; salbiy holat chat_member dan keladi,
+                # faqat mavjud salbiy yozuvning vaqti yangilanadi
+                if subscribed or stale:
+                    await self.channel_db.set_member_status_async(channel_id, user_id, subscribed)
+            else:
+                self.table_hits += 1
+
+            self._remember(user_id, channel_id, subscribed)
+            return subscribed
+        except Exception as e:
+            self.api_errors += 1
+            logger.warning(f"Kanal {channel_id} tekshirish xatolik: {e}")
+            return False
+
+    def _remember(self, user_id, channel_id, subscribed):
+        self._cache.set(
+            (user_id, channel_id), subscribed,
+            ttl=self.POSITIVE_TTL if subscribed else self.NEGATIVE_TTL
+        )
+
+    async def is_subscribed(self, user_id: int, fresh: bool = False) -> bool:
+        """Barcha kanallarga obunami"""
+        return all(subscribed for *_, subscribed in await self.check(user_id, fresh))
+
+    async def get_unsubscribed(self, user_id: int, fresh: bool = False) -> list:
+        """Obuna bo'lmagan kanallar: [(link, title), ...]"""
+        return [
+            (link, title)
+            for _, title, link, subscribed in await self.check(user_id, fresh)
+            if not subscribed
+        ]
+
+    # ==================== YANGILANISHLAR ====================
+    async def on_member_update(self, channel_id: int, user_id: int, status: str):
+        """chat_member yangilanishi: jadval va keshni yangilash"""
+        subscribed = status in SUBSCRIBED_STATUSES
+        await self.channel_db.set_member_status_async(channel_id, user_id, subscribed)
+        self._remember(user_id, channel_id, subscribed)
+        return subscribed
+
+    def clear_cache(self):
+        """Keshni tozalash"""
+        self._cache.clear()
+
+    def get_cache_stats(self) -> dict:
+        """Kesh va API statistikasi"""
+        self._cache.purge()
+        return {
+            **self._cache.stats(),
+            'positive_ttl': self.POSITIVE_TTL,
+            'negative_ttl': self.NEGATIVE_TTL,
+            'api_calls': self.api_calls,
+            'api_errors': self.api_errors,
+            'table_hits': self.table_hits,
+            'shared_checks': self.shared_checks,
+            'inflight': len(self._inflight)
+        }
+
+
+class _Watch:
+    """Kutilayotgan obuna tekshiruvi"""
+    __slots__ = ('user_id', 'on_success', 'on_timeout', 'attempt', 'started', 'slot')
+
+    def __init__(self, user_id, on_success, on_timeout, started):
+        self.user_id = user_id
+        self.on_success = on_success
+        self.on_timeout = on_timeout
+        self.attempt = 0
+        self.started = started
+        self.slot = None
+
+
+class SubscriptionWatcher:
+    """Obunani kutayotgan foydalanuvchilar uchun yagona rejalashtiruvchi
+
+    Har bir foydalanuvchi uchun alohida task o'rniga bitta timer wheel:
+    har tickda faqat vaqti kelgan yozuvlar tekshiriladi, urinishlar orasidagi
+    kutish eksponent oshadi, bir vaqtdagi tekshiruvlar soni cheklangan.
+    """
+
+    TICK = 1.0  # soniya
+    WHEEL_SIZE = 64  # MAX_DELAY / TICK dan katta bo'lishi kerak
+    FIRST_DELAY = 3
+    MAX_DELAY = 48
+    LIFETIME = 180  # Shundan keyin "vaqt tugadi"
+    MAX_INFLIGHT = 20  # Bir vaqtdagi tekshiruvlar
+
+    def __init__(self, service):
+        self.service = service
+
+        self._wheel = [set() for _ in range(self.WHEEL_SIZE)]
+        self._position = 0
+        self._entries = {}  # {user_id: _Watch}
+        self._inflight = set()  # Tekshirilayotgan user_id lar
+        self._task = None
+
+        self.checks = 0
+        self.confirmed = 0
+        self.expired = 0
+
+    # ==================== REJALASHTIRISH ====================
+    def watch(self, user_id, on_success, on_timeout):
+        """Foydalanuvchini kuzatuvga qo'shish (eski yozuv almashtiriladi)
+
+        on_success/on_timeout - argumentsiz coroutine funksiyalar.
+        """
+        self.cancel(user_id)
+        entry = _Watch(user_id, on_success, on_timeout, asyncio.get_running_loop().time())
+        self._entries[user_id] = entry
+        self._schedule(entry, self.FIRST_DELAY)
+
+    def cancel(self, user_id):
+        """Kuzatuvni bekor qilish"""
+        entry = self._entries.pop(user_id, None)
+        if entry and entry.slot is not None:
+            self._wheel[entry.slot].discard(user_id)
+        return entry is not None
+
+    def nudge(self, user_id):
+        """Keyingi tickda tekshirish (masalan, chat_member dan obuna keldi)"""
+        entry = self._entries.get(user_id)
+        if entry and entry.slot is not None:
+            self._wheel[entry.slot].discard(user_id)
+            self._schedule(entry, self.TICK)
+
+    def _schedule(self, entry, delay):
+        ticks = max(1, min(int(delay / self.TICK), self.WHEEL_SIZE - 1))
+        entry.slot = (self._position + ticks) % self.WHEEL_SIZE
+        self._wheel[entry.slot].add(entry.user_id)
+
+    def _next_delay(self, attempt):
+        return min(self.FIRST_DELAY * 2 ** attempt, self.MAX_DELAY)
+
+    # ==================== TICK ====================
+    def _tick(self):
+        self._position = (self._position + 1) % self.WHEEL_SIZE
+        due = self._wheel[self._position]
+        self._wheel[self._position] = set()
+
+        loop = asyncio.get_running_loop()
+        for user_id in due:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                continue
+            entry.slot = None
+
+            # Chegara to'lgan - keyingi tickka
+            if len(self._inflight) >= self.MAX_INFLIGHT or user_id in self._inflight:
+                self._schedule(entry, self.TICK)
+                continue
+
+            self._inflight.add(user_id)
+            loop.create_task(self._check(entry))
+
+    async def _check(self, entry):
+        user_id = entry.user_id
+        try:
+            self.checks += 1
+            subscribed = await self.service.is_subscribed(user_id, fresh=True)
+        except Exception as e:
+            logger.warning(f"Kuzatuv tekshiruvi xatolik {user_id}: {e}")
+            subscribed = False
+        finally:
+            self._inflight.discard(user_id)
+
+        # Tekshiruv paytida bekor qilingan yoki almashtirilgan
+        if self._entries.get(user_id) is not entry:
+            return
+
+        if subscribed:
+            del self._entries[user_id]
+            self.confirmed += 1
+            await self._notify(entry.on_success)
+            return
+
+        entry.attempt += 1
+        delay = self._next_delay(entry.attempt)
+        if asyncio.get_running_loop().time() - entry.started + delay > self.LIFETIME:
+            del self._entries[user_id]
+            self.expired += 1
+            await self._notify(entry.on_timeout)
+            return
+
+        self._schedule(entry, delay)
+
+    @staticmethod
+    async def _notify(callback):
+        try:
+            await callback()
+        except Exception as e:
+            logger.warning(f"Kuzatuv xabari xatolik: {e}")
+
+    # ==================== FON VAZIFA ====================
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.TICK)
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error(f"Kuzatuv tick xatolik: {e}")
+
+    def start(self):
+        """Rejalashtiruvchini ishga tushirish"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """To'xtatish va kuzatuvlarni tashlash"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for slot in self._wheel:
+            slot.clear()
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Rejalashtiruvchi statistikasi"""
+        return {
+            'watching': len(self._entries),
+            'inflight': len(self._inflight),
+            'checks': self.checks,
+            'confirmed': self.confirmed,
+            'expired': self.expired
+        }